@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Acuerdo sesión × sesión de toda la legislatura.
+
+Para cada par de sesiones (i, j), entre los diputados que votaron
+(A FAVOR o EN CONTRA) en las dos:
+
+    comunes      cuántos son
+    acuerdo      proporción que votó lo mismo en ambas
+    correlacion  correlación de Pearson de sus votos +1 / -1
+
+Con x = +1 A FAVOR / -1 EN CONTRA / 0 el resto y m = 1 si el diputado votó,
+todo sale de tres productos de matrices sobre la matriz de votos
+(ver matriz.py), sin recorrer pares:
+
+    comunes = mᵀm    coincide = xᵀx    sumas = xᵀm
+
+porque, entre quienes votaron en ambas, x_i·x_j es +1 si coinciden y -1
+si no, y x² = 1:
+
+    acuerdo     = (1 + xᵀx / comunes) / 2
+    correlacion = (n·xᵀx - s_i·s_j) / sqrt((n² - s_i²)(n² - s_j²))
+
+La correlación es NaN si alguna de las dos sesiones fue unánime entre los
+comunes (no hay variación con la que comparar).
+"""
+
+import numpy as np
+import pandas as pd
+
+from analisis import ESTADOS
+
+_FAVOR = ESTADOS.index("A FAVOR")
+_CONTRA = ESTADOS.index("EN CONTRA")
+
+# Resolución máxima del heatmap (sesiones por lado)
+MAX_SESIONES = 400
+
+# Pares con menos diputados en común no se listan entre los extremos
+MIN_COMUNES = 20
+
+
+def calcular(votos):
+    """
+    votos: matriz (diputados, sesiones) de códigos (matriz.abrir()["votos"]).
+    Devuelve {"comunes", "acuerdo", "correlacion"}, cada uno (sesiones, sesiones).
+    """
+    votos = np.asarray(votos)
+    x = (votos == _FAVOR).astype(np.float32) - (votos == _CONTRA)
+    m = (x != 0).astype(np.float32)
+
+    comunes = m.T @ m
+    coincide = x.T @ x
+    sumas = x.T @ m                      # sumas[i, j] = Σ x_i entre quienes votaron en j
+    s_i, s_j = sumas, sumas.T
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        acuerdo = np.where(comunes > 0, (1 + coincide / comunes) / 2, np.nan)
+        correlacion = (comunes * coincide - s_i * s_j) / np.sqrt(
+            (comunes ** 2 - s_i ** 2) * (comunes ** 2 - s_j ** 2)
+        )
+    correlacion = np.where(np.isfinite(correlacion), np.clip(correlacion, -1, 1), np.nan)
+
+    return {
+        "comunes": comunes.astype(np.int32),
+        "acuerdo": acuerdo.astype(np.float32),
+        "correlacion": correlacion.astype(np.float32),
+    }
+
+
+def _tabla(resultado, sesiones, i, j):
+    sesiones = np.asarray(sesiones, dtype=object)
+    return pd.DataFrame({
+        "sesion_1": sesiones[i],
+        "sesion_2": sesiones[j],
+        "comunes": resultado["comunes"][i, j],
+        "acuerdo": resultado["acuerdo"][i, j],
+        "correlacion": resultado["correlacion"][i, j],
+    })
+
+
+def extremos(resultado, sesiones, n=10, por="correlacion", minimo=MIN_COMUNES):
+    """
+    (más parecidos, más opuestos): DataFrames (sesion_1, sesion_2, comunes,
+    acuerdo, correlacion) con los n pares i < j de mayor y menor `por`,
+    entre los que tienen al menos `minimo` diputados en común. Sólo se arma
+    la tabla de esos pares, no la de todos.
+    """
+    i, j = np.triu_indices(len(sesiones), k=1)
+    valores = resultado[por][i, j]
+    validos = np.flatnonzero((resultado["comunes"][i, j] >= minimo) & np.isfinite(valores))
+    n = min(n, len(validos))
+    if n == 0:
+        vacia = _tabla(resultado, sesiones, i[:0], j[:0])
+        return vacia, vacia
+
+    salida = []
+    for signo in (-1, 1):
+        mejores = validos[np.argpartition(signo * valores[validos], n - 1)[:n]]
+        mejores = mejores[np.argsort(signo * valores[mejores], kind="stable")]
+        salida.append(_tabla(resultado, sesiones, i[mejores], j[mejores]))
+    return tuple(salida)
+
+
+def reducir(valores, maximo=MAX_SESIONES):
+    """
+    Promedia una matriz sesión × sesión en bloques de sesiones consecutivas
+    para que quepa en el gráfico (NaN no cuenta). Devuelve (matriz, cortes).
+    """
+    n = len(valores)
+    cortes = np.unique(np.linspace(0, n, min(n, maximo) + 1).astype(int)[:-1])
+    finitos = np.isfinite(valores)
+    sumas = np.add.reduceat(np.add.reduceat(np.where(finitos, valores, 0), cortes, axis=0), cortes, axis=1)
+    cuantos = np.add.reduceat(np.add.reduceat(finitos.astype(np.int32), cortes, axis=0), cortes, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(cuantos > 0, sumas / cuantos, np.nan), cortes
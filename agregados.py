@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Agregados incrementales de las comparaciones publicadas.
+
+Todo lo que muestra el dashboard como conteo (matriz de transición,
+transiciones por bloque, categorías de cambio por bloque, KPIs) se deriva
+de un tensor de conteos con forma (bloques, 5, 5): bloque × voto_1 × voto_2,
+con los cuatro ESTADOS más "OTRO" para votos no reconocidos.
+
+En disco, dentro de cada versión:
+
+    agregados/<par>.npz    # tensor de una comparación (sesión a → sesión b)
+    agregados/total.npz    # suma de los tensores de todas las comparaciones
+
+Cuando llega una sesión sólo se calcula el tensor del par nuevo y se suma
+(o resta, si un par deja de existir) al total, así que el costo depende
+de una sesión y no de toda la historia. Los archivos de pares que no
+cambian se heredan con hard links de la versión anterior.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analisis import ESTADOS, clasificar_cambio, normalizar_bloque, normalizar_estado
+
+ESTADOS_EXT = ESTADOS + ["OTRO"]
+N_ESTADOS = len(ESTADOS_EXT)
+
+# Categoría de cambio de cada celda (voto_1, voto_2) del tensor
+CATEGORIAS = np.array([
+    [clasificar_cambio({"voto_1": v1, "voto_2": v2}) for v2 in ESTADOS_EXT]
+    for v1 in ESTADOS_EXT
+])
+
+_VOTAN = [ESTADOS.index("A FAVOR"), ESTADOS.index("EN CONTRA")]
+_NO_VOTAN = [ESTADOS.index("AUSENTE"), ESTADOS.index("LICENCIA")]
+
+
+def ruta_par(par_id):
+    return f"agregados/{par_id}.npz"
+
+
+RUTA_TOTAL = "agregados/total.npz"
+
+
+# ====== Construcción ======
+
+def codificar_votos(votos):
+    """Índice en ESTADOS_EXT de cada voto (los no reconocidos van a OTRO)."""
+    codigos = pd.Categorical(pd.Series(votos).map(normalizar_estado), categories=ESTADOS).codes
+    return np.where(codigos < 0, len(ESTADOS), codigos)
+
+
+def tensor_desde_merged(merged):
+    """
+    Tensor de conteos de unos votos unidos (columnas bloque_1, voto_1, voto_2).
+    Devuelve {"bloques": [...], "conteos": ndarray (bloques, 5, 5)}.
+    """
+    bloques = merged["bloque_1"].map(normalizar_bloque)
+    b_cod, b_labels = pd.factorize(bloques, sort=True)
+
+    conteos = np.zeros((len(b_labels), N_ESTADOS, N_ESTADOS), dtype=np.int64)
+    np.add.at(
+        conteos,
+        (b_cod, codificar_votos(merged["voto_1"]), codificar_votos(merged["voto_2"])),
+        1,
+    )
+    return {"bloques": list(b_labels), "conteos": conteos}
+
+
+def vacio():
+    return {"bloques": [], "conteos": np.zeros((0, N_ESTADOS, N_ESTADOS), dtype=np.int64)}
+
+
+def alinear(agregado, bloques):
+    """Reordena/expande el tensor a la lista de bloques dada (con ceros donde falte)."""
+    pos = {b: i for i, b in enumerate(bloques)}
+    conteos = np.zeros((len(bloques), N_ESTADOS, N_ESTADOS), dtype=np.int64)
+    if agregado["bloques"]:
+        idx = [pos[b] for b in agregado["bloques"]]
+        conteos[idx] = agregado["conteos"]
+    return {"bloques": list(bloques), "conteos": conteos}
+
+
+def sumar(a, b, signo=1):
+    bloques = sorted(set(a["bloques"]) | set(b["bloques"]))
+    resultado = alinear(a, bloques)
+    resultado["conteos"] += signo * alinear(b, bloques)["conteos"]
+    return resultado
+
+
+# ====== Persistencia ======
+
+def guardar(agregado, ruta, pares=None):
+    np.savez(
+        ruta,
+        bloques=np.array(agregado["bloques"], dtype=str),
+        conteos=agregado["conteos"],
+        pares=np.array(pares if pares is not None else agregado.get("pares", []), dtype=str),
+    )
+
+
+def cargar(ruta):
+    with np.load(ruta) as z:
+        return {
+            "bloques": z["bloques"].tolist(),
+            "conteos": z["conteos"],
+            "pares": z["pares"].tolist(),
+        }
+
+
+def actualizar_total(temporal, anterior, quitar, agregar):
+    """
+    Aplica el delta al total de la versión en preparación.
+
+    temporal: directorio de la versión nueva (ya con los <par>.npz nuevos).
+    anterior: directorio de la versión vigente (de ahí se leen los tensores
+              que se restan, porque en `temporal` ya pudieron reemplazarse).
+    quitar / agregar: ids de pares que salen / entran al total.
+    """
+    temporal = Path(temporal)
+    total = vacio()
+    pares = []
+    if anterior is not None and (Path(anterior) / RUTA_TOTAL).exists():
+        total = cargar(Path(anterior) / RUTA_TOTAL)
+        pares = total["pares"]
+
+    for par_id in quitar:
+        if par_id in pares:
+            total = sumar(total, cargar(Path(anterior) / ruta_par(par_id)), signo=-1)
+            pares = [p for p in pares if p != par_id]
+
+    for par_id in agregar:
+        total = sumar(total, cargar(temporal / ruta_par(par_id)))
+        pares.append(par_id)
+
+    # Bloques que quedaron en cero (p. ej. un par reemplazado) no se arrastran
+    vivos = total["conteos"].any(axis=(1, 2))
+    total = {
+        "bloques": [b for b, v in zip(total["bloques"], vivos) if v],
+        "conteos": total["conteos"][vivos],
+    }
+
+    destino = temporal / RUTA_TOTAL
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    destino.unlink(missing_ok=True)
+    guardar(total, destino, pares)
+    return total
+
+
+# ====== Derivados (lo que antes se calculaba sobre el merged) ======
+
+def filtrar_bloque(agregado, bloque=None):
+    """Tensor 5×5 de un bloque, o de todos si bloque es None / "TODOS"."""
+    if bloque in (None, "TODOS"):
+        return agregado["conteos"].sum(axis=0)
+    if bloque not in agregado["bloques"]:
+        return np.zeros((N_ESTADOS, N_ESTADOS), dtype=np.int64)
+    return agregado["conteos"][agregado["bloques"].index(bloque)]
+
+
+def matriz_transicion(agregado, bloque=None):
+    """Matriz de conteos ESTADOS × ESTADOS (como mat_bloque / Matriz_conteos)."""
+    m = filtrar_bloque(agregado, bloque)[:len(ESTADOS), :len(ESTADOS)]
+    return pd.DataFrame(m, index=pd.Index(ESTADOS, name="voto_1"),
+                        columns=pd.Index(ESTADOS, name="voto_2"))
+
+
+def matriz_probabilidades(agregado, bloque=None):
+    conteos = matriz_transicion(agregado, bloque)
+    # NaN (no pd.NA) para que el resultado siga siendo float y se pueda graficar
+    return conteos.div(conteos.sum(axis=1).replace(0, np.nan), axis=0)
+
+
+def conteos_por_estado(agregado):
+    """Mismo orden que conteos_por_estado() de app.py."""
+    m = filtrar_bloque(agregado)
+    fila, col = m.sum(axis=1), m.sum(axis=0)
+    return (*[int(x) for x in fila[:len(ESTADOS)]], *[int(x) for x in col[:len(ESTADOS)]])
+
+
+def kpis_basicos(agregado):
+    """Mismo orden que calcular_kpis_basicos() de app.py."""
+    m = filtrar_bloque(agregado)
+    favor, contra = _VOTAN
+    total_iguales = int(np.trace(m))
+    favor_a_contra = int(m[favor, contra])
+    contra_a_favor = int(m[contra, favor])
+    se_desactivan = int(m[np.ix_(_VOTAN, _NO_VOTAN)].sum())
+    se_activan = int(m[np.ix_(_NO_VOTAN, _VOTAN)].sum())
+    return total_iguales, favor_a_contra, contra_a_favor, se_desactivan, se_activan
+
+
+def categorias_por_bloque(agregado):
+    """Diputados por bloque y categoría de cambio (columnas bloque_norm, categoria_cambio, Diputados)."""
+    filas = []
+    for bloque, m in zip(agregado["bloques"], agregado["conteos"]):
+        por_categoria = pd.Series(m.ravel()).groupby(CATEGORIAS.ravel()).sum()
+        for categoria, n in por_categoria[por_categoria > 0].items():
+            filas.append((bloque, categoria, int(n)))
+    return pd.DataFrame(filas, columns=["bloque_norm", "categoria_cambio", "Diputados"])
+
+
+def transiciones_por_bloque(agregado):
+    """Formato largo (como la hoja Trans_por_bloque): bloque, voto_1, voto_2, conteo."""
+    b, i, j = np.nonzero(agregado["conteos"])
+    return pd.DataFrame({
+        "bloque": np.array(agregado["bloques"], dtype=object)[b],
+        "voto_1": np.array(ESTADOS_EXT, dtype=object)[i],
+        "voto_2": np.array(ESTADOS_EXT, dtype=object)[j],
+        "conteo": agregado["conteos"][b, i, j],
+    })
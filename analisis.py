@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Análisis de transiciones entre dos votaciones (antes sólo en votaciones.ipynb).
+
+Lo usan el notebook, el daemon de ingesta y el dashboard, así que aquí
+no debe haber nada que dependa de Streamlit.
+"""
+
+import pandas as pd
+
+# ====== ESTADOS CANÓNICOS (para la matriz tipo Markov) ======
+ESTADOS = ["A FAVOR", "EN CONTRA", "AUSENTE", "LICENCIA"]
+
+
+def normalizar_estado(s):
+    s = str(s).strip().upper()
+    s = s.replace("Á", "A")
+    for e in ESTADOS:
+        if s == e:
+            return e
+    return s
+
+
+def normalizar_bloque(s):
+    s = str(s)
+    s = " ".join(s.split())   # colapsa espacios internos
+    s = s.strip().upper()
+    return s
+
+
+# ====== FUNCIONES DE CARGA Y LIMPIEZA ======
+
+def estandarizar_votacion(df, nombre_ronda):
+    """
+    Deja una tabla de votación con columnas estandarizadas:
+    nombre, bloque, voto, ronda
+    """
+    df = df.copy()
+
+    # Normalizar nombres de columnas
+    df.columns = [str(c).strip().upper() for c in df.columns]
+
+    # Tratar de mapear a las columnas que nos interesan
+    col_nombre = None
+    col_bloque = None
+    col_voto = None
+
+    for c in df.columns:
+        if "NOMBRE" in c:
+            col_nombre = c
+        if "BLOQUE" in c:
+            col_bloque = c
+        if "VOTO" in c or "VOTO EMITIDO" in c:
+            col_voto = c
+
+    if not col_nombre or not col_voto:
+        raise ValueError(
+            f"No encontré columnas de NOMBRE/VOTO. "
+            f"Columnas encontradas: {df.columns.tolist()}"
+        )
+
+    # Si no trae bloque, lo dejamos como NaN
+    if col_bloque is None:
+        df["BLOQUE"] = None
+        col_bloque = "BLOQUE"
+
+    # Filas vacías (p. ej. celdas combinadas del PDF)
+    df = df[df[col_nombre].notna() & (df[col_nombre].astype(str).str.strip() != "")]
+
+    out = pd.DataFrame()
+    out["nombre"] = df[col_nombre].astype(str).str.strip()
+    out["bloque"] = df[col_bloque].astype(str).str.strip()
+    out["voto"]   = df[col_voto].astype(str).str.strip().str.upper()
+    out["ronda"]  = nombre_ronda
+
+    return out.reset_index(drop=True)
+
+
+def cargar_votacion(path, nombre_ronda, sheet_name=None):
+    """
+    Lee un Excel de votación y lo deja con columnas estandarizadas:
+    nombre, bloque, voto, ronda
+    """
+    # sheet_name=None devolvería un dict con todas las hojas
+    df = pd.read_excel(path, sheet_name=sheet_name if sheet_name is not None else 0)
+    try:
+        return estandarizar_votacion(df, nombre_ronda)
+    except ValueError as e:
+        raise ValueError(f"{e} (archivo: {path})") from None
+
+
+# =========  CATEGORÍA DE CAMBIO POR DIPUTADO  =========
+
+def clasificar_cambio(row):
+    v1 = row["voto_1"]
+    v2 = row["voto_2"]
+
+    # 1) Se mantiene igual
+    if v1 == v2:
+        return "Se mantiene"
+
+    # 2) Cambia opinión entre A FAVOR y EN CONTRA
+    if (v1 == "A FAVOR" and v2 == "EN CONTRA") or (v1 == "EN CONTRA" and v2 == "A FAVOR"):
+        return "Cambia opinion Favor/Contra"
+
+    # 3) Se activa: no votaba -> vota
+    if v1 in ["AUSENTE", "LICENCIA"] and v2 in ["A FAVOR", "EN CONTRA"]:
+        return "Se activa (no votaba -> vota)"
+
+    # 4) Se desactiva: votaba -> no vota
+    if v1 in ["A FAVOR", "EN CONTRA"] and v2 in ["AUSENTE", "LICENCIA"]:
+        return "Se desactiva (vota -> no vota)"
+
+    # 5) Cambia tipo de no voto
+    if v1 in ["AUSENTE", "LICENCIA"] and v2 in ["AUSENTE", "LICENCIA"]:
+        return "Cambia tipo de no voto"
+
+    # 6) Otros cambios raros (por si hay textos distintos)
+    return "Otro cambio"
+
+
+def unir_votaciones(v1, v2):
+    """
+    Une dos votaciones estandarizadas por nombre (inner join: solo quienes
+    aparecen en ambas rondas), normaliza los votos y agrega la categoría
+    de cambio.
+    """
+    merged = (
+        v1.merge(
+            v2,
+            on="nombre",
+            suffixes=("_1", "_2"),  # _1 = primera vuelta, _2 = segunda
+            how="inner",
+        )
+    )
+    merged = merged.sort_values("nombre").reset_index(drop=True)
+
+    merged["voto_1"] = merged["voto_1"].map(normalizar_estado)
+    merged["voto_2"] = merged["voto_2"].map(normalizar_estado)
+    merged["categoria_cambio"] = merged.apply(clasificar_cambio, axis=1)
+    return merged
+
+
+def analizar_votaciones(merged):
+    """
+    Calcula los subconjuntos y matrices de transición a partir de los
+    votos unidos. Devuelve un dict {nombre_hoja: DataFrame} en el orden
+    en que se exportan al Excel.
+    """
+    # =========  CONJUNTOS ESPECÍFICOS  =========
+
+    # EN CONTRA en la primera y A FAVOR en la segunda
+    contra_a_favor = merged[
+        (merged["voto_1"] == "EN CONTRA") & (merged["voto_2"] == "A FAVOR")
+    ]
+
+    # AUSENTE o LICENCIA en la primera y SÍ votaron en la segunda
+    aus_lic_1_y_votan_2 = merged[
+        (merged["voto_1"].isin(["AUSENTE", "LICENCIA"])) &
+        (merged["voto_2"].isin(["A FAVOR", "EN CONTRA"]))
+    ]
+
+    # A FAVOR en la primera y cambian de opinión en la segunda
+    favor_1_cambian_2 = merged[
+        (merged["voto_1"] == "A FAVOR") & (merged["voto_2"] != "A FAVOR")
+    ]
+
+    se_mantienen = merged[merged["voto_1"] == merged["voto_2"]]
+
+    cambian_opinion_favor_contra = merged[
+        ((merged["voto_1"] == "A FAVOR") & (merged["voto_2"] == "EN CONTRA")) |
+        ((merged["voto_1"] == "EN CONTRA") & (merged["voto_2"] == "A FAVOR"))
+    ]
+
+    se_desactivan = merged[
+        (merged["voto_1"].isin(["A FAVOR", "EN CONTRA"])) &
+        (merged["voto_2"].isin(["AUSENTE", "LICENCIA"]))
+    ]
+
+    cambian_tipo_no_voto = merged[
+        ((merged["voto_1"] == "AUSENTE") & (merged["voto_2"] == "LICENCIA")) |
+        ((merged["voto_1"] == "LICENCIA") & (merged["voto_2"] == "AUSENTE"))
+    ]
+
+    # =========  MATRIZ DE TRANSICIÓN =========
+
+    transition_counts = (
+        merged
+        .groupby(["voto_1", "voto_2"])
+        .size()
+        .unstack(fill_value=0)
+        .reindex(index=ESTADOS, columns=ESTADOS, fill_value=0)
+    )
+
+    transition_probs = transition_counts.div(
+        transition_counts.sum(axis=1).replace(0, pd.NA), axis=0
+    )
+
+    resumen_transiciones = (
+        merged
+        .groupby(["voto_1", "voto_2"])
+        .size()
+        .reset_index(name="conteo")
+        .sort_values("conteo", ascending=False)
+    )
+
+    transiciones_por_bloque = (
+        merged
+        .groupby(["bloque_1", "voto_1", "voto_2"])
+        .size()
+        .reset_index(name="conteo")
+    )
+
+    return {
+        "Votos_unidos": merged,
+        "Contra_a_Favor": contra_a_favor,
+        "AusLic_a_Votan": aus_lic_1_y_votan_2,
+        "Favor_cambia": favor_1_cambian_2,
+        "Se_mantienen": se_mantienen,
+        "Cambian_Fav_Contra": cambian_opinion_favor_contra,
+        "Se_activan": aus_lic_1_y_votan_2,
+        "Se_desactivan": se_desactivan,
+        "Cambian_tipo_no_voto": cambian_tipo_no_voto,
+        "Matriz_conteos": transition_counts,
+        "Matriz_probabilidades": transition_probs,
+        "Transiciones_todas": resumen_transiciones,
+        "Trans_por_bloque": transiciones_por_bloque,
+    }
+
+
+# Las matrices llevan los estados como índice; el resto se exporta sin índice
+HOJAS_CON_INDICE = {"Matriz_conteos", "Matriz_probabilidades"}
+
+
+def exportar_analisis(hojas, output_excel):
+    """Escribe el dict de analizar_votaciones() en un Excel, una hoja por entrada."""
+    with pd.ExcelWriter(output_excel, engine="openpyxl") as writer:
+        for nombre_hoja, df in hojas.items():
+            df.to_excel(writer, sheet_name=nombre_hoja, index=nombre_hoja in HOJAS_CON_INDICE)
+    return output_excel
@@ -3,10 +3,28 @@
 
 import os
 import tempfile
+import time
 
-import pandas as pd
+import numpy as np
 import streamlit as st
-import plotly.express as px
+
+import acuerdo
+import agregados
+import carga
+import consultas
+import exportar
+import grilla
+import intervalos
+import simulacion
+import versiones
+from carga import (
+    EXCEL_6433, EXCEL_6625, firma_archivo, cargar_votos_unidos,
+    cargar_agregado, cargar_intervalos, intervalos_de_excel,
+)
+from analisis import ESTADOS
+
+# Tiempo del primer render de cada sección (ver carga.registrar_render)
+INICIO_RENDER = time.perf_counter()
 
 st.set_page_config(
     page_title="Visualización de Resultados",
@@ -110,46 +128,11 @@ footer {visibility: hidden;}
 """, unsafe_allow_html=True)
 
 
-ESTADOS = ["A FAVOR", "EN CONTRA", "AUSENTE", "LICENCIA"]
-EXCEL_6433 = "analisis_votaciones.xlsx"
-EXCEL_6625 = "analisis_votaciones_presupuesto.xlsx"
+# Cada cuántos segundos se revisa si ingesta.py publicó una versión nueva
+INTERVALO_REFRESCO = 5
 
 # ============ Funciones comunes ============
 
-def normalizar_estado(s):
-    s = str(s).strip().upper()
-    s = s.replace("Á", "A")
-    for e in ESTADOS:
-        if s == e:
-            return e
-    return s
-
-def normalizar_bloque(s):
-    s = str(s)
-    s = " ".join(s.split())   # colapsa espacios internos
-    s = s.strip().upper()
-    return s
-
-def agregar_categoria_cambio(df):
-    if "categoria_cambio" in df.columns:
-        return df
-    def clasificar_cambio(row):
-        v1 = row["voto_1"]
-        v2 = row["voto_2"]
-        if v1 == v2:
-            return "Se mantiene"
-        if (v1 == "A FAVOR" and v2 == "EN CONTRA") or (v1 == "EN CONTRA" and v2 == "A FAVOR"):
-            return "Cambia opinión Favor/Contra"
-        if v1 in ["AUSENTE", "LICENCIA"] and v2 in ["A FAVOR", "EN CONTRA"]:
-            return "Se activa (no votaba → vota)"
-        if v1 in ["A FAVOR", "EN CONTRA"] and v2 in ["AUSENTE", "LICENCIA"]:
-            return "Se desactiva (votaba → no vota)"
-        if v1 in ["AUSENTE", "LICENCIA"] and v2 in ["AUSENTE", "LICENCIA"]:
-            return "Cambia tipo de no voto"
-        return "Otro cambio"
-    df["categoria_cambio"] = df.apply(clasificar_cambio, axis=1)
-    return df
-
 def calcular_kpis_basicos(df):
     total_iguales = (df["voto_1"] == df["voto_2"]).sum()
     favor_a_contra = ((df["voto_1"] == "A FAVOR") & (df["voto_2"] == "EN CONTRA")).sum()
@@ -201,17 +184,624 @@ def run_markov_pipeline(pdf1_path, id1, pdf2_path, id2):
     output_excel = "analisis_votaciones.xlsx"
     return output_excel
 
+@st.fragment(run_every=INTERVALO_REFRESCO)
+def vigilar_dataset(version):
+    """
+    Si ingesta.py publicó una versión nueva, recarga la app. No hace falta
+    invalidar nada: las llaves del cache llevan la versión (ver carga.py).
+    """
+    if versiones.version_actual() != version:
+        st.rerun()
+    if version is not None:
+        st.caption(f"Datos: versión {version}")
+
+def tarjeta_metrica(titulo, valor):
+    return f"""
+        <div class="metric-card">
+            <div class="metric-title">{titulo}</div>
+            <div class="metric-value">{valor}</div>
+        </div>
+        """
+
+def agregar_intervalos(fig, ic, bloque):
+    """Muestra en el hover de un heatmap de transiciones la probabilidad y su IC."""
+    p, inferior, superior = intervalos.del_bloque(ic, bloque)
+    fig.update_traces(
+        customdata=np.stack([p, inferior, superior], axis=-1),
+        hovertemplate=(
+            "Voto anterior: %{y}<br>Voto siguiente: %{x}<br>Valor: %{z}<br>"
+            "Probabilidad: %{customdata[0]:.0%} "
+            f"(IC {ic['nivel']:.0%}: "
+            "%{customdata[1]:.0%} - %{customdata[2]:.0%})<extra></extra>"
+        ),
+    )
+    return fig
+
+def botones_exportacion(directorio, clave, nombre, generar_partes):
+    """
+    Un botón de descarga por formato de la vista filtrada. El archivo se
+    genera recién al hacer clic, de a partes y en un hilo aparte (ver
+    exportar.py); si ya se había pedido lo mismo se reutiliza. Streamlit
+    sirve la descarga desde memoria, así que el archivo completo sí pasa
+    por el servidor al descargarlo.
+    generar_partes no puede usar st.*: corre fuera del script.
+    """
+    st.caption(
+        "Descargar esta vista. Parquet es el más liviano y Excel el más lento. El archivo se "
+        "genera de a partes, pero la descarga se sirve entera desde la memoria del servidor: "
+        "para extractos muy grandes conviene acotar sesiones o bloque."
+    )
+    for col, (formato, (etiqueta, mime)) in zip(st.columns(len(exportar.FORMATOS)), exportar.FORMATOS.items()):
+        with col:
+            st.download_button(
+                etiqueta,
+                data=lambda f=formato: exportar.contenido(directorio, clave, f, generar_partes),
+                file_name=f"{nombre}.{formato}",
+                mime=mime,
+                key=f"exportar-{clave}-{formato}",
+                on_click="ignore",
+                use_container_width=True,
+            )
+
+def etiqueta_sesion(sesion):
+    if sesion.get("evento") is not None:
+        return f"Evento #{sesion['evento']}"
+    return sesion["titulo"]
+
+def mostrar_comparacion(version, agregado, ic, comparacion, sesiones):
+    """
+    Dashboard genérico para un par de sesiones publicado por ingesta.py.
+    Los conteos salen del tensor de agregados y la tabla de detalle por
+    diputado se consulta a la base de la versión (carga.detalle_comparacion).
+    """
+    import plotly.express as px
+
+    et1 = etiqueta_sesion(sesiones[comparacion["sesion_1"]])
+    et2 = etiqueta_sesion(sesiones[comparacion["sesion_2"]])
+
+    (favor_1, contra_1, aus_1, lic_1,
+     favor_2, contra_2, aus_2, lic_2) = agregados.conteos_por_estado(agregado)
+
+    total_iguales, favor_a_contra, contra_a_favor, se_desactivan, se_activan = agregados.kpis_basicos(agregado)
+    resultado_texto, bg_color, fg_color = resultado_global(favor_2, contra_2)
+
+    st.title(f"{et1} vs {et2}")
+    st.caption(comparacion["titulo"])
+
+    st.subheader("Resumen de votos por votación")
+    for titulo, conteos in [
+        (sesiones[comparacion["sesion_1"]]["titulo"], (favor_1, contra_1, aus_1, lic_1)),
+        (sesiones[comparacion["sesion_2"]]["titulo"], (favor_2, contra_2, aus_2, lic_2)),
+    ]:
+        st.markdown(f"### {titulo}")
+        for col, estado, valor in zip(st.columns(4), ESTADOS, conteos):
+            with col:
+                st.markdown(tarjeta_metrica(estado, valor), unsafe_allow_html=True)
+        st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
+
+    st.markdown(
+        f"""
+        <div style="
+            margin-top: 1rem;
+            margin-bottom: 1.5rem;
+            padding: 1rem 1.5rem;
+            border-radius: 0.6rem;
+            background-color: {bg_color};
+            color: {fg_color};
+            text-align: center;
+            font-size: 1.3rem;
+            font-weight: 700;">
+            Resultado {et2}: {resultado_texto}
+        </div>
+        """,
+        unsafe_allow_html=True,
+    )
+
+    st.subheader(f"Comportamiento entre {et1} y {et2}")
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Misma votación", total_iguales)
+    col2.metric("A FAVOR → EN CONTRA", favor_a_contra)
+    col3.metric("EN CONTRA → A FAVOR", contra_a_favor)
+    col4.metric("Se desactivaron (votaban → no)", se_desactivan)
+    col5.metric("Se activaron (no votaban → votan)", se_activan)
+
+    st.markdown("---")
+
+    st.subheader("Votaciones por bloque")
+
+    bloques = ["TODOS"] + sorted(agregado["bloques"])
+    bloque_sel = st.selectbox("Selecciona un bloque", bloques)
+
+    mat_bloque = agregados.matriz_transicion(agregado, bloque_sel)
+
+    fig_heat = px.imshow(
+        mat_bloque,
+        text_auto=True,
+        labels=dict(x=f"Voto {et2}", y=f"Voto {et1}", color="Conteo"),
+        x=mat_bloque.columns,
+        y=mat_bloque.index,
+        title=f"Transiciones de voto - Bloque {bloque_sel}",
+    )
+    agregar_intervalos(fig_heat, ic, bloque_sel)
+    st.plotly_chart(fig_heat, use_container_width=True)
+
+    st.markdown(f"### Detalle de diputados del bloque {bloque_sel}")
+
+    categorias_bloque = carga.categorias_comparacion(version, comparacion, bloque_sel)
+
+    f1, f2 = st.columns([2, 1])
+    with f1:
+        tipo_cambio_bloque = st.multiselect(
+            "Filtrar por tipo de comportamiento",
+            categorias_bloque,
+            default=categorias_bloque,
+        )
+    with f2:
+        voto2_sel = st.selectbox(f"Filtrar por voto {et2}", ["Todos"] + ESTADOS)
+
+    df_detalle = carga.detalle_comparacion(
+        version, comparacion, bloque_sel, categorias=tipo_cambio_bloque, voto_2=voto2_sel,
+    )
+
+    df_detalle = df_detalle.rename(columns={
+        "nombre": "Nombre",
+        "bloque_1": "Bloque",
+        "voto_1": f"Voto {et1}",
+        "voto_2": f"Voto {et2}",
+        "categoria_cambio": "Categoría de Cambio",
+    })
+
+    st.dataframe(
+        df_detalle[["Nombre", "Bloque", f"Voto {et1}", f"Voto {et2}", "Categoría de Cambio"]]
+        .sort_values(["Bloque", "Nombre"]),
+        use_container_width=True
+    )
+
+    botones_exportacion(
+        versiones.ruta_exportes(version),
+        exportar.llave("comparacion", version, comparacion["id"], bloque_sel, tipo_cambio_bloque, voto2_sel),
+        f"{comparacion['id']}_{bloque_sel}",
+        lambda: exportar.renombrar(
+            carga.partes_comparacion(version, comparacion, bloque_sel, tipo_cambio_bloque, voto2_sel),
+            {"nombre": "Nombre", "bloque_1": "Bloque", "voto_1": f"Voto {et1}",
+             "voto_2": f"Voto {et2}", "categoria_cambio": "Categoría de Cambio"},
+        ),
+    )
+
+    st.markdown("---")
+
+    st.subheader("Cambios de voto por bloque - Todos los bloques")
+
+    mostrar_categorias_por_bloque(agregado, "Cambios de voto por bloque - Todos los bloques")
+
+    st.markdown("---")
+    mostrar_simulacion(version, comparacion, sesiones)
+
+def mostrar_simulacion(version, comparacion, sesiones, acumulado=None):
+    """
+    Probabilidad de cada resultado en la votación que sigue a la sesión 2
+    de `comparacion`, simulada con las transiciones por bloque (ver
+    simulacion.py). acumulado=None deja elegir entre las transiciones del
+    par y las acumuladas; True / False fija la fuente.
+    """
+    import plotly.express as px
+
+    et2 = etiqueta_sesion(sesiones[comparacion["sesion_2"]])
+    st.subheader(f"Simulación de la votación siguiente a {et2}")
+
+    s1, s2, s3 = st.columns([2, 2, 1])
+    with s1:
+        regla = st.selectbox(
+            "Regla de aprobación", list(simulacion.REGLAS), format_func=simulacion.REGLAS.get,
+        )
+    with s2:
+        if acumulado is None:
+            hay_total = (versiones.ruta_version(version) / agregados.RUTA_TOTAL).exists()
+            fuentes = ["Transiciones de este par"] + (["Transiciones acumuladas"] if hay_total else [])
+            acumulado = st.radio("Transiciones por bloque", fuentes, horizontal=True) != fuentes[0]
+        else:
+            st.caption("Transiciones acumuladas de todas las comparaciones")
+    with s3:
+        incertidumbre = st.checkbox("Incluir incertidumbre", value=True,
+                                    help="Cada simulación usa su propia matriz de transición, "
+                                         "muestreada según cuántos diputados la respaldan.")
+
+    sim = carga.simular_votacion(version, comparacion, acumulado, regla, incertidumbre)
+
+    for col, (nombre, prob) in zip(st.columns(len(simulacion.RESULTADOS)), sim["probabilidades"].items()):
+        with col:
+            st.markdown(tarjeta_metrica(nombre, f"{prob:.1%}"), unsafe_allow_html=True)
+
+    fig_sim = px.histogram(
+        x=sim["favor"],
+        labels=dict(x="Votos A FAVOR"),
+        title=f"Votos A FAVOR en {sim['n_simulaciones']:,} simulaciones",
+        color_discrete_sequence=["#27ae60"],
+    )
+    fig_sim.update_layout(yaxis_title="Simulaciones", bargap=0.05)
+    if sim["umbral"] is not None:
+        fig_sim.add_vline(x=sim["umbral"] - 0.5, line_dash="dash", line_color="#e74c3c",
+                          annotation_text=f"Umbral: {sim['umbral']}")
+    st.plotly_chart(fig_sim, use_container_width=True)
+    st.caption(
+        f"Quórum: {sim['quorum']} diputados presentes (A FAVOR + EN CONTRA) de "
+        f"{simulacion.TOTAL_DIPUTADOS}. Cada diputado parte de su voto en {et2}."
+    )
+
+    st.markdown("### Bloques pivote")
+    st.caption("Probabilidad de que el resultado cambie si el bloque vota al revés "
+               "(sus votos A FAVOR pasan a EN CONTRA y viceversa).")
+    st.dataframe(
+        sim["pivotes"].sort_values("prob_pivote", ascending=False).rename(columns={
+            "bloque": "Bloque",
+            "diputados": "Diputados",
+            "prob_pivote": "Prob. de ser pivote",
+            "favor_esperado": "A FAVOR esperados",
+        }).style.format({"Prob. de ser pivote": "{:.1%}", "A FAVOR esperados": "{:.1f}"}),
+        use_container_width=True, hide_index=True,
+    )
+
+def mostrar_categorias_por_bloque(agregado, titulo):
+    import plotly.express as px
+
+    resumen_bloques = agregados.categorias_por_bloque(agregado).rename(columns={
+        "bloque_norm": "Bloque",
+        "categoria_cambio": "Categoría de Cambio",
+    })
+
+    fig_bar = px.bar(
+        resumen_bloques,
+        x="Bloque",
+        y="Diputados",
+        color="Categoría de Cambio",
+        title=titulo,
+    )
+    fig_bar.update_layout(
+        xaxis_tickangle=-45,
+        xaxis=dict(categoryorder="total descending"),
+        height=700,
+        margin=dict(t=60),
+    )
+    st.plotly_chart(fig_bar, use_container_width=True)
+
+def mostrar_acumulado(version, total, ic, comparaciones, sesiones):
+    """Transiciones acumuladas de todas las comparaciones consecutivas publicadas."""
+    st.title("Acumulado de todas las votaciones")
+    st.caption(f"{len(comparaciones)} comparaciones entre votaciones consecutivas")
+
+    import plotly.express as px
+
+    total_iguales, favor_a_contra, contra_a_favor, se_desactivan, se_activan = agregados.kpis_basicos(total)
+
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Misma votación", total_iguales)
+    col2.metric("A FAVOR → EN CONTRA", favor_a_contra)
+    col3.metric("EN CONTRA → A FAVOR", contra_a_favor)
+    col4.metric("Se desactivaron (votaban → no)", se_desactivan)
+    col5.metric("Se activaron (no votaban → votan)", se_activan)
+
+    st.markdown("---")
+
+    bloques = ["TODOS"] + sorted(total["bloques"])
+    bloque_sel = st.selectbox("Selecciona un bloque", bloques)
+
+    h1, h2 = st.columns(2)
+    with h1:
+        mat = agregados.matriz_transicion(total, bloque_sel)
+        st.plotly_chart(agregar_intervalos(px.imshow(
+            mat,
+            text_auto=True,
+            labels=dict(x="Voto siguiente", y="Voto anterior", color="Conteo"),
+            title=f"Transiciones acumuladas - Bloque {bloque_sel}",
+        ), ic, bloque_sel), use_container_width=True)
+    with h2:
+        probs = agregados.matriz_probabilidades(total, bloque_sel)
+        st.plotly_chart(agregar_intervalos(px.imshow(
+            probs,
+            text_auto=".0%",
+            zmin=0, zmax=1,
+            labels=dict(x="Voto siguiente", y="Voto anterior", color="Probabilidad"),
+            title=f"Probabilidades de transición - Bloque {bloque_sel}",
+        ), ic, bloque_sel), use_container_width=True)
+    st.caption(
+        f"Pasa el cursor sobre una celda para ver el intervalo de confianza "
+        f"({ic['nivel']:.0%}, bootstrap con {ic['n_replicas']} réplicas). "
+        "En bloques chicos el intervalo es ancho: un 100% de 2 diputados dice poco."
+    )
+
+    st.markdown("---")
+    mostrar_categorias_por_bloque(total, "Cambios de voto por bloque - Acumulado")
+
+    st.markdown("---")
+    mostrar_simulacion(version, comparaciones[-1], sesiones, acumulado=True)
+
+def mostrar_consultas(version, sesiones):
+    """Preguntas que cruzan sesiones, resueltas en la base SQLite de la versión."""
+    directorio = versiones.ruta_version(version)
+    st.title("Consultas entre sesiones")
+    st.caption(f"{len(sesiones)} sesiones publicadas")
+
+    st.subheader("Diputados que repiten un voto")
+    c1, c2, c3, c4 = st.columns(4)
+    with c1:
+        bloque_sel = st.selectbox("Bloque", ["TODOS"] + consultas.bloques(directorio))
+    with c2:
+        voto_sel = st.selectbox("Voto", ESTADOS, index=ESTADOS.index("EN CONTRA"))
+    with c3:
+        ultimas = st.number_input(
+            "En las últimas N sesiones", min_value=1, max_value=len(sesiones),
+            value=min(10, len(sesiones)),
+        )
+    with c4:
+        minimo = st.number_input("Al menos (veces)", min_value=1, max_value=int(ultimas),
+                                 value=min(3, int(ultimas)))
+
+    inicio = time.perf_counter()
+    df_reinc = consultas.reincidentes(directorio, voto_sel, int(minimo), int(ultimas), bloque_sel)
+    st.dataframe(
+        df_reinc.rename(columns={
+            "nombre": "Nombre",
+            "bloque_norm": "Bloque",
+            "veces": f"Veces {voto_sel}",
+            "sesiones": "Sesiones presentes",
+        }),
+        use_container_width=True,
+    )
+    st.caption(f"{len(df_reinc)} diputados · consulta en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+    st.markdown("---")
+
+    st.subheader("Historial de un diputado")
+    nombres = consultas.consultar(directorio, "SELECT DISTINCT nombre FROM votos ORDER BY 1")["nombre"]
+    nombre_sel = st.selectbox("Diputado", nombres)
+    if nombre_sel:
+        st.dataframe(
+            consultas.historial(directorio, nombre_sel)[["titulo", "bloque", "voto"]]
+            .rename(columns={"titulo": "Sesión", "bloque": "Bloque", "voto": "Voto"}),
+            use_container_width=True,
+        )
+
+    st.markdown("---")
+
+    st.subheader("Extracto de votos de varias sesiones")
+    st.caption("Un voto por fila, en orden de sesión. Se genera al descargar, sin cargarlo en pantalla.")
+    e1, e2, e3 = st.columns(3)
+    with e1:
+        bloque_ext = st.selectbox("Bloque", ["TODOS"] + consultas.bloques(directorio), key="extracto_bloque")
+    with e2:
+        voto_ext = st.selectbox("Voto", ["Todos"] + ESTADOS, key="extracto_voto")
+    with e3:
+        ultimas_ext = st.number_input(
+            "Últimas N sesiones", min_value=1, max_value=len(sesiones), value=len(sesiones),
+            key="extracto_ultimas",
+        )
+
+    botones_exportacion(
+        versiones.ruta_exportes(version),
+        exportar.llave("extracto", version, bloque_ext, voto_ext, int(ultimas_ext)),
+        f"votos_{bloque_ext}_{voto_ext}_{int(ultimas_ext)}".replace(" ", "_"),
+        lambda: exportar.renombrar(
+            carga.partes_extracto(version, bloque_ext, voto_ext, int(ultimas_ext)),
+            {"orden": "Orden", "sesion": "Sesión", "titulo": "Título", "nombre": "Nombre",
+             "bloque": "Bloque", "voto": "Voto"},
+        ),
+    )
+
+def etiquetas_unicas(etiquetas, respaldo):
+    """Las etiquetas tal cual si no se repiten; si no, las de respaldo (p. ej. ids)."""
+    return etiquetas if len(set(etiquetas)) == len(etiquetas) else respaldo
+
+def mostrar_grilla(version, sesiones):
+    """
+    Voto de cada diputado en cada sesión. La región visible se agrega en el
+    servidor a la resolución del gráfico (ver grilla.py); al acercarse con
+    los deslizadores se vuelve a consultar con más detalle.
+    """
+    import plotly.graph_objects as go
+
+    st.title("Grilla diputado × sesión")
+
+    m = carga.abrir_matriz(version)
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        orden = st.selectbox("Ordenar diputados por", grilla.ORDENES)
+    with col2:
+        por_perfil = st.checkbox("Ordenar sesiones por perfil de voto")
+    orden_actual = carga.orden_grilla(version, orden, por_perfil)
+    filas, columnas = orden_actual["filas"], orden_actual["columnas"]
+
+    n_filas, n_columnas = len(filas), len(columnas)
+    f0, f1 = st.slider("Diputados visibles", 0, n_filas, (0, n_filas))
+    c0, c1 = st.slider("Sesiones visibles", 0, n_columnas, (0, n_columnas))
+    # Un rango vacío (p. ej. (n, n)) muestra al menos la última fila / columna
+    f0, c0 = min(f0, n_filas - 1), min(c0, n_columnas - 1)
+    f1, c1 = max(f1, f0 + 1), max(c1, c0 + 1)
+
+    etiquetas_filas = [
+        f"{nombre} · {bloque}"
+        for nombre, bloque in zip(m["diputados"][filas], orden_actual["bloques"])
+    ]
+    ids = [m["sesiones"][j] for j in columnas]
+    etiquetas_columnas = etiquetas_unicas(
+        [sesiones[i]["titulo"] if i in sesiones else i for i in ids], ids
+    )
+
+    v = grilla.vista(
+        m, filas, columnas, (f0, f1), (c0, c1),
+        etiquetas_filas=etiquetas_filas, etiquetas_columnas=etiquetas_columnas,
+    )
+    casillas = v["balance"].shape
+
+    # Heatmapgl ya no existe en las versiones nuevas de Plotly; el heatmap
+    # normal se dibuja en canvas y con la vista agregada alcanza
+    Heatmap = getattr(go, "Heatmapgl", go.Heatmap)
+    fig = go.Figure(Heatmap(
+        z=v["balance"],
+        x=v["columnas"],
+        y=v["filas"],
+        customdata=v["proporciones"],
+        zmin=-1, zmax=1,
+        colorscale=[[0, "#e74c3c"], [0.5, "#f2f2f2"], [1, "#27ae60"]],
+        colorbar=dict(title="A favor − en contra", tickformat=".0%"),
+        hoverongaps=False,
+        hovertemplate="%{y}<br>%{x}<br>" + "<br>".join(
+            f"{estado}: %{{customdata[{i}]:.0%}}" for i, estado in enumerate(ESTADOS)
+        ) + "<extra></extra>",
+    ))
+    fig.update_layout(
+        height=grilla.ALTO_PX,
+        margin=dict(t=30, l=10, r=10, b=10),
+        yaxis=dict(autorange="reversed", showticklabels=casillas[0] <= 60),
+        xaxis=dict(showticklabels=casillas[1] <= 40, tickangle=-45),
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    por_f, por_c = v["celdas_por_casilla"]
+    if por_f == 1 and por_c == 1:
+        st.caption(f"{casillas[0]} × {casillas[1]} celdas: cada casilla es un voto.")
+    else:
+        st.caption(
+            f"{f1 - f0} diputados × {c1 - c0} sesiones agregados en "
+            f"{casillas[0]} × {casillas[1]} casillas (hasta {por_f} × {por_c} celdas cada una). "
+            "Achica los rangos para ver los votos individuales."
+        )
+
+def comparacion_entre(sesion_1, sesion_2, sesiones):
+    """Comparación de cualquier par de sesiones, con las mismas llaves que las de ingesta.py."""
+    return {
+        "id": f"{sesion_1}__{sesion_2}",
+        "sesion_1": sesion_1,
+        "sesion_2": sesion_2,
+        "titulo": f"{sesiones[sesion_1]['titulo']} vs {sesiones[sesion_2]['titulo']}",
+    }
+
+def mostrar_acuerdo(version, sesiones):
+    """
+    Acuerdo entre todos los pares de sesiones (ver acuerdo.py), los pares
+    más parecidos y más opuestos, y el dashboard de comparación para
+    cualquier par, armado desde la matriz sin un Excel por par.
+    """
+    import plotly.graph_objects as go
+
+    st.title("Acuerdo entre sesiones")
+
+    m = carga.abrir_matriz(version)
+    ids = list(m["sesiones"])
+    etiquetas = dict(zip(ids, etiquetas_unicas([etiqueta_sesion(sesiones[i]) for i in ids], ids)))
+    resultado = carga.acuerdo_sesiones(version)
+
+    medidas = {
+        "correlacion": "Correlación de los votos (+1 / -1)",
+        "acuerdo": "Proporción que vota igual",
+    }
+    m1, m2 = st.columns([2, 1])
+    with m1:
+        medida = st.radio("Medida", list(medidas), format_func=medidas.get, horizontal=True)
+    with m2:
+        minimo = st.number_input("Mínimo de diputados en común", 1, 500, acuerdo.MIN_COMUNES)
+
+    valores, cortes = acuerdo.reducir(resultado[medida])
+    finales = np.append(cortes[1:], len(ids)) - 1
+    ejes = [
+        etiquetas[ids[i]] if i == f else f"{etiquetas[ids[i]]} … {etiquetas[ids[f]]} ({f - i + 1})"
+        for i, f in zip(cortes, finales)
+    ]
+    fig = go.Figure(go.Heatmap(
+        z=valores, x=ejes, y=ejes,
+        zmin=-1 if medida == "correlacion" else 0, zmax=1,
+        colorscale=[[0, "#e74c3c"], [0.5, "#f2f2f2"], [1, "#27ae60"]],
+        colorbar=dict(title=medidas[medida], tickformat=".0%" if medida == "acuerdo" else ".2f"),
+        hoverongaps=False,
+        hovertemplate="%{y}<br>%{x}<br>%{z:.2f}<extra></extra>",
+    ))
+    fig.update_layout(
+        height=grilla.ALTO_PX,
+        margin=dict(t=30, l=10, r=10, b=10),
+        yaxis=dict(autorange="reversed", showticklabels=len(ejes) <= 40),
+        xaxis=dict(showticklabels=len(ejes) <= 40, tickangle=-45),
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    if len(ejes) < len(ids):
+        st.caption(f"{len(ids)} sesiones promediadas en {len(ejes)} grupos de sesiones consecutivas.")
+
+    parecidos, opuestos = acuerdo.extremos(resultado, ids, n=10, por=medida, minimo=minimo)
+
+    def tabla(df):
+        return df.assign(
+            sesion_1=df["sesion_1"].map(etiquetas), sesion_2=df["sesion_2"].map(etiquetas),
+        ).rename(columns={
+            "sesion_1": "Sesión 1",
+            "sesion_2": "Sesión 2",
+            "comunes": "Diputados en común",
+            "acuerdo": "Votan igual",
+            "correlacion": "Correlación",
+        }).style.format({"Votan igual": "{:.0%}", "Correlación": "{:.2f}"})
+
+    t1, t2 = st.columns(2)
+    with t1:
+        st.markdown("### Pares más parecidos")
+        st.dataframe(tabla(parecidos), use_container_width=True, hide_index=True)
+    with t2:
+        st.markdown("### Pares más opuestos")
+        st.dataframe(tabla(opuestos), use_container_width=True, hide_index=True)
+
+    st.markdown("---")
+    st.subheader("Comparar cualquier par de sesiones")
+
+    # Por defecto, el par más opuesto
+    defecto = (opuestos.iloc[0]["sesion_1"], opuestos.iloc[0]["sesion_2"]) if len(opuestos) else (ids[0], ids[1])
+    p1, p2 = st.columns(2)
+    with p1:
+        sesion_1 = st.selectbox("Sesión 1", ids, index=ids.index(defecto[0]), format_func=etiquetas.get)
+    with p2:
+        sesion_2 = st.selectbox("Sesión 2", ids, index=ids.index(defecto[1]), format_func=etiquetas.get)
+    if sesion_1 == sesion_2:
+        st.info("Elige dos sesiones distintas.")
+        return
+
+    comparacion = comparacion_entre(sesion_1, sesion_2, sesiones)
+    mostrar_comparacion(
+        version,
+        carga.agregado_de_par(version, comparacion),
+        carga.intervalos_de_par(version, comparacion),
+        comparacion,
+        sesiones,
+    )
+
 # ============ Sidebar ============
 
+VERSION = versiones.version_actual()
+MANIFIESTO = versiones.leer_manifiesto(VERSION)
+SESIONES = {s["id"]: s for s in MANIFIESTO["sesiones"]}
+COMPARACIONES = {c["titulo"]: c for c in MANIFIESTO["comparaciones"]}
+ACUMULADO = "Acumulado - todas las votaciones"
+CONSULTAS = "Consultas entre sesiones"
+GRILLA = "Grilla diputado × sesión"
+ACUERDO = "Acuerdo entre sesiones"
+HAY_CONSULTAS = VERSION is not None and consultas.existe(versiones.ruta_version(VERSION))
+
+# Las demás secciones se cargan en segundo plano mientras se dibuja esta
+carga.iniciar_precarga(VERSION)
+
 with st.sidebar:
     st.title("Visualización de Resultados")
     seccion = st.radio(
         "Comportamiento en Votaciones",
         ["6433 - Participación de CACIF en la Comisión de Infraestructura ANADIE",
-         "6625 - Aprobación de Presupuesto"],
+         "6625 - Aprobación de Presupuesto"]
+        + list(COMPARACIONES)
+        + ([ACUMULADO] if len(COMPARACIONES) > 1 else [])
+        + ([CONSULTAS] if HAY_CONSULTAS else [])
+        + ([GRILLA] if len(SESIONES) > 1 and carga.abrir_matriz(VERSION) is not None else [])
+        + ([ACUERDO] if len(SESIONES) > 2 and carga.abrir_matriz(VERSION) is not None else []),
         index=0
     )
     st.markdown("---")
+    vigilar_dataset(VERSION)
+    if carga.TIEMPOS:
+        with st.expander("Tiempos de arranque"):
+            for etapa, segundos in carga.TIEMPOS.items():
+                st.caption(f"{etapa}: {segundos:.2f} s")
 
 # ======================================================
 #  SECCIÓN 6433 – 1ª vs 2ª vuelta participación CACIF
@@ -220,15 +810,11 @@ with st.sidebar:
 #  SECCIÓN 6433 – 1ª vs 2ª vuelta participación CACIF
 # ======================================================
 if seccion.startswith("6433"):
+    # Plotly Express sólo se importa cuando hay que graficar
+    import plotly.express as px
 
     # === Cargar datos ===
-    merged = pd.read_excel(EXCEL_6433, sheet_name="Votos_unidos")
-    merged.columns = [c.strip() for c in merged.columns]
-
-    merged["voto_1"] = merged["voto_1"].map(normalizar_estado)
-    merged["voto_2"] = merged["voto_2"].map(normalizar_estado)
-    merged["bloque_norm"] = merged["bloque_1"].map(normalizar_bloque)
-    merged = agregar_categoria_cambio(merged)
+    merged = cargar_votos_unidos(EXCEL_6433, firma_archivo(EXCEL_6433))
 
     # Conteos
     (favor_1, contra_1, aus_1, lic_1,
@@ -391,6 +977,7 @@ if seccion.startswith("6433"):
         y=mat_bloque.index,
         title=f"Transiciones de voto - Bloque {bloque_sel}",
     )
+    agregar_intervalos(fig_heat, intervalos_de_excel(EXCEL_6433, firma_archivo(EXCEL_6433)), bloque_sel)
 
     st.plotly_chart(fig_heat, use_container_width=True)
 
@@ -418,10 +1005,16 @@ if seccion.startswith("6433"):
         "categoria_cambio": "Categoría de Cambio",
     })
 
-    st.dataframe(
-        df_detalle[["Nombre", "Bloque", "Voto 1ª vuelta", "Voto 2ª vuelta", "Categoría de Cambio"]]
-        .sort_values(["Bloque", "Nombre"]),
-        use_container_width=True
+    df_detalle = df_detalle[
+        ["Nombre", "Bloque", "Voto 1ª vuelta", "Voto 2ª vuelta", "Categoría de Cambio"]
+    ].sort_values(["Bloque", "Nombre"])
+    st.dataframe(df_detalle, use_container_width=True)
+
+    botones_exportacion(
+        versiones.exportes_fijos(EXCEL_6433, firma_archivo(EXCEL_6433)),
+        exportar.llave(EXCEL_6433, bloque_sel, tipo_cambio_bloque, voto2_sel),
+        f"6433_{bloque_sel}",
+        lambda df=df_detalle: exportar.partes_de(df),
     )
 
     st.markdown("---")
@@ -478,7 +1071,7 @@ if seccion.startswith("6433"):
     df_mantienen = merged[
         (merged["voto_1"] == merged["voto_2"]) &
         (merged["voto_1"].isin(["A FAVOR", "EN CONTRA"]))
-    ].copy()
+    ]
 
     if df_mantienen.empty:
         st.info("No hay diputados que se mantuvieran A FAVOR o EN CONTRA en ambas vueltas.")
@@ -534,14 +1127,10 @@ if seccion.startswith("6433"):
 #  SECCIÓN 6625 – 2ª vuelta CACIF vs Aprobación Presupuesto
 # ======================================================
 elif seccion.startswith("6625"):
-    # === Cargar datos ===
-    merged = pd.read_excel(EXCEL_6625, sheet_name="Votos_unidos")
-    merged.columns = [c.strip() for c in merged.columns]
+    import plotly.express as px
 
-    merged["voto_1"] = merged["voto_1"].map(normalizar_estado)
-    merged["voto_2"] = merged["voto_2"].map(normalizar_estado)
-    merged["bloque_norm"] = merged["bloque_1"].map(normalizar_bloque)
-    merged = agregar_categoria_cambio(merged)
+    # === Cargar datos ===
+    merged = cargar_votos_unidos(EXCEL_6625, firma_archivo(EXCEL_6625))
 
     (favor_1, contra_1, aus_1, lic_1,
      favor_2, contra_2, aus_2, lic_2) = conteos_por_estado(merged)
@@ -746,10 +1335,12 @@ elif seccion.startswith("6625"):
     bloque_sel = st.selectbox("Selecciona un bloque", options=bloques)
 
     # Data filtrada por bloque (para heatmap + tabla)
+    # Sin .copy(): merged es compartido y de sólo lectura, y los filtros ya
+    # devuelven un DataFrame nuevo
     if bloque_sel == "TODOS":
-        df_b = merged.copy()
+        df_b = merged
     else:
-        df_b = merged[merged["bloque_norm"] == bloque_sel].copy()
+        df_b = merged[merged["bloque_norm"] == bloque_sel]
 
     # --- Heatmap ---
     mat_bloque = (
@@ -774,6 +1365,7 @@ elif seccion.startswith("6625"):
         y=mat_bloque.index,
         title=f"Transiciones de sentido de voto - Bloque {titulo_bloque}",
     )
+    agregar_intervalos(fig_heat, intervalos_de_excel(EXCEL_6625, firma_archivo(EXCEL_6625)), bloque_sel)
     st.plotly_chart(fig_heat, use_container_width=True)
 
     # --- Tabla de detalle (mismo filtro de bloque) ---
@@ -796,7 +1388,7 @@ elif seccion.startswith("6625"):
             index=0
         )
 
-    df_detalle = df_b[df_b["categoria_cambio"].isin(tipo_cambio_bloque)].copy()
+    df_detalle = df_b[df_b["categoria_cambio"].isin(tipo_cambio_bloque)]
 
     if voto2_sel != "Todos":
         df_detalle = df_detalle[df_detalle["voto_2"] == voto2_sel]
@@ -815,6 +1407,13 @@ elif seccion.startswith("6625"):
 
     st.dataframe(df_detalle, use_container_width=True)
 
+    botones_exportacion(
+        versiones.exportes_fijos(EXCEL_6625, firma_archivo(EXCEL_6625)),
+        exportar.llave(EXCEL_6625, bloque_sel, tipo_cambio_bloque, voto2_sel),
+        f"6625_{bloque_sel}",
+        lambda df=df_detalle: exportar.partes_de(df),
+    )
+
     st.markdown("---")
 
     # =======================
@@ -861,7 +1460,7 @@ elif seccion.startswith("6625"):
     df_mantienen = merged[
         (merged["voto_1"] == merged["voto_2"]) &
         (merged["voto_1"].isin(["A FAVOR", "EN CONTRA"]))
-    ].copy()
+    ]
 
     if df_mantienen.empty:
         st.info("No hay diputados que mantuvieran A FAVOR o EN CONTRA en ambos temas.")
@@ -900,6 +1499,31 @@ elif seccion.startswith("6625"):
 
         st.plotly_chart(fig_mant, use_container_width=True)
 
+# ======================================================
+#  Comparaciones publicadas por ingesta.py
+# ======================================================
+elif seccion in COMPARACIONES:
+    comparacion = COMPARACIONES[seccion]
+    directorio = versiones.ruta_version(VERSION)
+    agregado = cargar_agregado(str(directorio / agregados.ruta_par(comparacion["id"])), VERSION)
+    ic = cargar_intervalos(str(directorio / intervalos.ruta_par(comparacion["id"])), VERSION)
+    mostrar_comparacion(VERSION, agregado, ic, comparacion, SESIONES)
+
+elif seccion == ACUMULADO:
+    directorio = versiones.ruta_version(VERSION)
+    total = cargar_agregado(str(directorio / agregados.RUTA_TOTAL), VERSION)
+    ic = cargar_intervalos(str(directorio / intervalos.RUTA_TOTAL), VERSION)
+    mostrar_acumulado(VERSION, total, ic, MANIFIESTO["comparaciones"], SESIONES)
+
+elif seccion == CONSULTAS:
+    mostrar_consultas(VERSION, MANIFIESTO["sesiones"])
+
+elif seccion == GRILLA:
+    mostrar_grilla(VERSION, SESIONES)
+
+elif seccion == ACUERDO:
+    mostrar_acuerdo(VERSION, SESIONES)
+
 # ======================================================
 #  SECCIÓN 3 – Solo carga (contenido principal)
 # (ahora mismo no se usa porque el radio no tiene la opción)
@@ -911,3 +1535,5 @@ else:
     asignarles un identificador y generar el Excel de entrada para el dashboard.  
     Puedes reutilizar esta opción cada vez que tengas nuevas votaciones.
     """)
+
+carga.registrar_render(seccion, time.perf_counter() - INICIO_RENDER)
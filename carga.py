@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Carga cacheada de los datos del dashboard y precarga al arrancar.
+
+Las funciones cacheadas viven en este módulo (y no en app.py) para que
+servidor.py pueda llenar el mismo cache antes de que llegue el primer
+usuario: la llave del cache es módulo + nombre + código fuente, así que
+da igual si las llama el hilo de precarga o una sesión.
+
+Se usa st.cache_resource y no st.cache_data: cache_data devuelve una copia
+en cada llamada, o sea una copia de los datos por sesión y por rerun. Con
+cache_resource todas las sesiones del proceso comparten el mismo objeto,
+que por eso se trata como de sólo lectura (los arrays quedan marcados así).
+Los votos de las versiones publicadas ni siquiera se copian al proceso: se
+leen de la matriz mapeada en memoria (ver matriz.py). Todas las llaves
+llevan la versión, así que una versión nueva simplemente usa otras
+entradas y las viejas salen por max_entries.
+
+    precargar(version)          # todo lo que usan las secciones del sidebar
+    iniciar_precarga(version)   # lo mismo en un hilo, una vez por versión
+
+Los tiempos de arranque, de cada precarga y del primer render de cada
+sección quedan en TIEMPOS y se escriben a stdout.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import acuerdo
+import agregados
+import consultas
+import exportar
+import grilla
+import intervalos
+import matriz
+import simulacion
+import versiones
+from analisis import normalizar_estado, normalizar_bloque
+
+EXCEL_6433 = "analisis_votaciones.xlsx"
+EXCEL_6625 = "analisis_votaciones_presupuesto.xlsx"
+EXCELS_FIJOS = [EXCEL_6433, EXCEL_6625]
+
+# Importar este módulo es lo primero que hace el servidor (o la primera sesión)
+INICIO = time.perf_counter()
+
+# etapa -> segundos, para este proceso
+TIEMPOS = {}
+
+_candado = threading.Lock()
+_precargadas = set()
+_renderizadas = set()
+
+
+def log(msg):
+    print(f"[{datetime.now():%H:%M:%S}] {msg}", flush=True)
+
+
+@contextmanager
+def medir(etapa):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        TIEMPOS[etapa] = time.perf_counter() - t0
+        log(f"{etapa}: {TIEMPOS[etapa]:.2f} s")
+
+
+class _SinAvisoDePrecarga(logging.Filter):
+    # Los hilos de precarga no tienen ScriptRunContext a propósito: no
+    # pertenecen a ninguna sesión y no deben dibujar spinners en ninguna
+    def filter(self, record):
+        return not threading.current_thread().name.startswith("precarga")
+
+
+logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(
+    _SinAvisoDePrecarga()
+)
+
+
+# ====== Carga (cacheada por versión) ======
+
+def agregar_categoria_cambio(df):
+    if "categoria_cambio" in df.columns:
+        return df
+    def clasificar_cambio(row):
+        v1 = row["voto_1"]
+        v2 = row["voto_2"]
+        if v1 == v2:
+            return "Se mantiene"
+        if (v1 == "A FAVOR" and v2 == "EN CONTRA") or (v1 == "EN CONTRA" and v2 == "A FAVOR"):
+            return "Cambia opinión Favor/Contra"
+        if v1 in ["AUSENTE", "LICENCIA"] and v2 in ["A FAVOR", "EN CONTRA"]:
+            return "Se activa (no votaba → vota)"
+        if v1 in ["A FAVOR", "EN CONTRA"] and v2 in ["AUSENTE", "LICENCIA"]:
+            return "Se desactiva (votaba → no vota)"
+        if v1 in ["AUSENTE", "LICENCIA"] and v2 in ["AUSENTE", "LICENCIA"]:
+            return "Cambia tipo de no voto"
+        return "Otro cambio"
+    df["categoria_cambio"] = df.apply(clasificar_cambio, axis=1)
+    return df
+
+def firma_archivo(path):
+    """Llave de cache para los Excel fijos: cambia si alguien regenera el archivo."""
+    return os.stat(path).st_mtime_ns
+
+def _solo_lectura(datos):
+    for valor in datos.values():
+        if isinstance(valor, np.ndarray):
+            valor.flags.writeable = False
+    return datos
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def cargar_votos_unidos(path, version):
+    # `version` no se usa adentro: sólo forma parte de la llave del cache
+    merged = pd.read_excel(path, sheet_name="Votos_unidos")
+    merged.columns = [c.strip() for c in merged.columns]
+
+    merged["voto_1"] = merged["voto_1"].map(normalizar_estado)
+    merged["voto_2"] = merged["voto_2"].map(normalizar_estado)
+    merged["bloque_norm"] = merged["bloque_1"].map(normalizar_bloque)
+    merged = agregar_categoria_cambio(merged)
+    return merged
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def cargar_agregado(path, version):
+    return _solo_lectura(agregados.cargar(path))
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def cargar_intervalos(path, version):
+    return _solo_lectura(intervalos.cargar(path))
+
+@st.cache_resource(max_entries=8, show_spinner="Calculando intervalos de confianza...")
+def intervalos_de_excel(path, version):
+    """Para los Excel fijos, que no traen intervalos precalculados."""
+    agregado = agregados.tensor_desde_merged(cargar_votos_unidos(path, version))
+    return _solo_lectura(intervalos.calcular_intervalos(agregado, trabajadores=1))
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def abrir_matriz(version):
+    """Matriz mapeada de la versión, o None si se publicó antes de que existiera."""
+    directorio = versiones.ruta_version(version)
+    return matriz.abrir(directorio) if matriz.existe(directorio) else None
+
+def votos_unidos_publicados(version, comparacion):
+    """
+    Votos unidos de una comparación publicada. Salen de la matriz mapeada
+    (un DataFrame chico, armado en cada rerun y descartado al terminar);
+    sólo las versiones sin matriz leen la hoja Votos_unidos del libro.
+    """
+    m = abrir_matriz(version)
+    if m is None:
+        return cargar_votos_unidos(str(versiones.ruta_version(version) / comparacion["archivo"]), version)
+    return matriz.votos_unidos(m, comparacion["sesion_1"], comparacion["sesion_2"])
+
+@st.cache_resource(max_entries=8, show_spinner="Ordenando diputados...")
+def orden_grilla(version, orden, sesiones_por_perfil):
+    """Orden de filas y columnas de la grilla diputado × sesión (ver grilla.py)."""
+    return _solo_lectura(dict(zip(
+        ("filas", "columnas", "bloques"),
+        grilla.ordenar(abrir_matriz(version), orden, sesiones_por_perfil),
+    )))
+
+def agregado_de_par(version, comparacion):
+    """
+    Tensor de conteos de un par de sesiones: el publicado por ingesta.py si
+    el par es consecutivo, o armado desde la matriz para cualquier otro par.
+    """
+    ruta = versiones.ruta_version(version) / agregados.ruta_par(comparacion["id"])
+    if ruta.exists():
+        return cargar_agregado(str(ruta), version)
+    return _par_desde_matriz(version, comparacion["sesion_1"], comparacion["sesion_2"])["agregado"]
+
+def intervalos_de_par(version, comparacion):
+    """Intervalos de un par: los publicados, o calculados como en agregado_de_par."""
+    ruta = versiones.ruta_version(version) / intervalos.ruta_par(comparacion["id"])
+    if ruta.exists():
+        return cargar_intervalos(str(ruta), version)
+    return _par_desde_matriz(version, comparacion["sesion_1"], comparacion["sesion_2"])["intervalos"]
+
+@st.cache_resource(max_entries=16, show_spinner="Calculando la comparación...")
+def _par_desde_matriz(version, sesion_1, sesion_2):
+    agregado = _solo_lectura(agregados.tensor_desde_merged(
+        matriz.votos_unidos(abrir_matriz(version), sesion_1, sesion_2)
+    ))
+    return {
+        "agregado": agregado,
+        "intervalos": _solo_lectura(intervalos.calcular_intervalos(agregado, trabajadores=1)),
+    }
+
+@st.cache_resource(max_entries=2, show_spinner="Calculando acuerdo entre sesiones...")
+def acuerdo_sesiones(version):
+    """Acuerdo y correlación de todos los pares de sesiones (ver acuerdo.py)."""
+    return _solo_lectura(acuerdo.calcular(abrir_matriz(version)["votos"]))
+
+def detalle_comparacion(version, comparacion, bloque=None, categorias=None, voto_2=None):
+    """
+    Tabla de detalle de una comparación publicada, ya filtrada. La resuelve
+    la base SQLite de la versión (ver consultas.py); las versiones que no la
+    traen filtran los votos unidos en memoria.
+    """
+    directorio = versiones.ruta_version(version)
+    if consultas.existe(directorio):
+        return consultas.votos_unidos(
+            directorio, comparacion["sesion_1"], comparacion["sesion_2"],
+            bloque=bloque, categorias=categorias, voto_2=voto_2,
+        )
+
+    df = votos_unidos_publicados(version, comparacion)
+    if bloque not in (None, "TODOS"):
+        df = df[df["bloque_norm"] == bloque]
+    if categorias is not None:
+        df = df[df["categoria_cambio"].isin(categorias)]
+    if voto_2 not in (None, "Todos"):
+        df = df[df["voto_2"] == voto_2]
+    return df
+
+def categorias_comparacion(version, comparacion, bloque=None):
+    """Opciones del filtro de categorías de una comparación publicada (ver detalle_comparacion)."""
+    directorio = versiones.ruta_version(version)
+    if consultas.existe(directorio):
+        return consultas.categorias_presentes(
+            directorio, comparacion["sesion_1"], comparacion["sesion_2"], bloque,
+        )
+    return sorted(detalle_comparacion(version, comparacion, bloque)["categoria_cambio"].unique())
+
+@st.cache_resource(max_entries=32, show_spinner="Simulando la próxima votación...")
+def simular_votacion(version, comparacion, acumulado=False, regla="absoluta", incertidumbre=True):
+    """
+    Monte Carlo de la votación que sigue a la sesión 2 de `comparacion`
+    (ver simulacion.py): cada diputado parte de su voto en esa sesión y
+    cambia según las transiciones de su bloque en este par o, con
+    acumulado=True, en todas las comparaciones publicadas.
+    """
+    if acumulado:
+        agregado = cargar_agregado(str(versiones.ruta_version(version) / agregados.RUTA_TOTAL), version)
+    else:
+        agregado = agregado_de_par(version, comparacion)
+    detalle = detalle_comparacion(version, comparacion)
+    resultado = simulacion.simular(
+        agregado, detalle["bloque_norm"].astype(object), detalle["voto_2"].astype(object),
+        regla=regla, incertidumbre=incertidumbre,
+    )
+    resultado["pivotes"] = pd.DataFrame(resultado["pivotes"])
+    return _solo_lectura(resultado)
+
+def partes_comparacion(version, comparacion, bloque=None, categorias=None, voto_2=None):
+    """
+    detalle_comparacion() de a partes, para exportar sin tener la tabla
+    completa en memoria (sale de la base SQLite de la versión).
+    """
+    directorio = versiones.ruta_version(version)
+    if consultas.existe(directorio):
+        return consultas.votos_unidos_por_partes(
+            directorio, comparacion["sesion_1"], comparacion["sesion_2"],
+            bloque=bloque, categorias=categorias, voto_2=voto_2,
+        )
+    return exportar.partes_de(detalle_comparacion(version, comparacion, bloque, categorias, voto_2))
+
+def partes_extracto(version, bloque=None, voto=None, ultimas=None):
+    """
+    Votos de las últimas `ultimas` sesiones (todas si es None), de a partes.
+    Salen de la matriz mapeada, que arma cada parte con índices en vez de
+    leer fila por fila; las versiones sin matriz usan la base SQLite.
+    """
+    m = abrir_matriz(version)
+    if m is None:
+        return consultas.votos_por_partes(versiones.ruta_version(version), bloque, voto, ultimas)
+    titulos = {s["id"]: s["titulo"] for s in versiones.leer_manifiesto(version)["sesiones"]}
+    sesiones = m["sesiones"] if ultimas is None else m["sesiones"][-ultimas:]
+    return matriz.votos_por_partes(
+        m, sesiones, bloque, voto, titulos=[titulos.get(i, i) for i in m["sesiones"]],
+    )
+
+
+# ====== Precarga ======
+
+def calentar_graficos():
+    """
+    Importa Plotly Express y arma una figura de cada tipo que usa el
+    dashboard: la primera figura de cada tipo carga los validadores de
+    plotly de forma perezosa y es la que más tarda.
+    """
+    import plotly.express as px
+
+    k = len(agregados.ESTADOS)
+    px.imshow(np.zeros((k, k)), text_auto=True).update_traces(
+        customdata=np.zeros((k, k, 3)), hovertemplate="%{customdata[0]:.0%}"
+    ).to_json()
+    px.bar(
+        pd.DataFrame({"Bloque": ["-"], "Diputados": [0], "Categoría de Cambio": ["-"]}),
+        x="Bloque", y="Diputados", color="Categoría de Cambio",
+    ).to_json()
+    px.histogram(x=np.zeros(1)).add_vline(x=0).to_json()
+
+
+def tareas_de_precarga(version):
+    """(etapa, función) de todo lo que necesitan las secciones del sidebar."""
+    tareas = [("gráficos", calentar_graficos)]
+
+    for excel in EXCELS_FIJOS:
+        if os.path.exists(excel):
+            firma = firma_archivo(excel)
+            tareas.append((excel, lambda e=excel, f=firma: intervalos_de_excel(e, f)))
+
+    if version is not None:
+        directorio = versiones.ruta_version(version)
+        tareas.append(("matriz", lambda: abrir_matriz(version)))
+        tareas.append(("grilla", lambda: abrir_matriz(version) is not None
+                       and orden_grilla(version, grilla.ORDEN_BLOQUE, False)))
+        tareas.append(("acuerdo", lambda: abrir_matriz(version) is not None
+                       and acuerdo_sesiones(version)))
+        for c in versiones.leer_manifiesto(version)["comparaciones"]:
+            def cargar_par(c=c):
+                detalle_comparacion(version, c)
+                cargar_agregado(str(directorio / agregados.ruta_par(c["id"])), version)
+                cargar_intervalos(str(directorio / intervalos.ruta_par(c["id"])), version)
+                simular_votacion(version, c)
+            tareas.append((c["id"], cargar_par))
+
+        def cargar_total():
+            cargar_agregado(str(directorio / agregados.RUTA_TOTAL), version)
+            cargar_intervalos(str(directorio / intervalos.RUTA_TOTAL), version)
+            comparaciones = versiones.leer_manifiesto(version)["comparaciones"]
+            if comparaciones:
+                simular_votacion(version, comparaciones[-1], acumulado=True)
+        tareas.append(("total", cargar_total))
+
+    return tareas
+
+
+def precargar(version):
+    """Llena el cache de todas las secciones. Un error en una no frena las demás."""
+    with medir(f"precarga {version or 'sin dataset'}"):
+        for etapa, tarea in tareas_de_precarga(version):
+            try:
+                tarea()
+            except Exception as e:
+                log(f"[ERROR] precarga de {etapa}: {e}")
+    TIEMPOS["arranque → precarga lista"] = time.perf_counter() - INICIO
+
+
+def iniciar_precarga(version):
+    """Corre precargar(version) en segundo plano, una sola vez por versión y proceso."""
+    with _candado:
+        if version in _precargadas:
+            return False
+        _precargadas.add(version)
+    threading.Thread(
+        target=precargar, args=(version,), name=f"precarga-{version}", daemon=True
+    ).start()
+    return True
+
+
+def registrar_render(seccion, segundos):
+    """Guarda cuánto tardó el primer render de cada sección en este proceso."""
+    with _candado:
+        if seccion in _renderizadas:
+            return
+        _renderizadas.add(seccion)
+    TIEMPOS[f"primer render: {seccion[:40]}"] = segundos
+    log(f"primer render de {seccion[:40]}: {segundos:.2f} s")
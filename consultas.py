@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Base de consultas (SQLite) de cada versión publicada.
+
+    consultas.sqlite
+      sesiones(id, orden, fecha, evento, iniciativa, titulo)
+      votos(sesion, nombre, bloque, bloque_norm, voto)      # una fila por diputado y sesión
+      categorias(voto_1, voto_2, categoria_cambio)          # las 25 celdas de agregados.CATEGORIAS
+
+con índices por diputado, bloque, sesión y voto, para preguntas que
+cruzan sesiones sin cargar nada en memoria:
+
+    >>> reincidentes(directorio, bloque="VOS", voto="EN CONTRA", minimo=3, ultimas=10)
+
+Como el resto de la versión, el archivo no se modifica después de
+publicado y se abre en modo inmutable (sin locks). Se arma en forma
+incremental: se copia la base de la versión anterior y sólo se borran e
+insertan los votos de las sesiones nuevas o reemplazadas.
+"""
+
+import shutil
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import pandas as pd
+
+import agregados
+import versiones
+from analisis import normalizar_bloque, normalizar_estado
+
+RUTA = "consultas.sqlite"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS sesiones (
+    id TEXT PRIMARY KEY,
+    orden INTEGER NOT NULL,
+    fecha TEXT,
+    evento INTEGER,
+    iniciativa TEXT,
+    titulo TEXT
+);
+CREATE TABLE IF NOT EXISTS votos (
+    sesion TEXT NOT NULL,
+    nombre TEXT NOT NULL,
+    bloque TEXT,
+    bloque_norm TEXT,
+    voto TEXT NOT NULL,
+    PRIMARY KEY (sesion, nombre)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS votos_nombre ON votos (nombre, sesion);
+CREATE INDEX IF NOT EXISTS votos_bloque ON votos (bloque_norm, voto, sesion);
+CREATE INDEX IF NOT EXISTS votos_voto ON votos (voto, sesion);
+CREATE TABLE IF NOT EXISTS categorias (
+    voto_1 TEXT NOT NULL,
+    voto_2 TEXT NOT NULL,
+    categoria_cambio TEXT NOT NULL,
+    PRIMARY KEY (voto_1, voto_2)
+) WITHOUT ROWID;
+"""
+
+
+def existe(directorio):
+    return (Path(directorio) / RUTA).exists()
+
+
+# ====== Construcción (ingesta) ======
+
+def actualizar(temporal, sesiones, anterior=None, cambiadas=()):
+    """
+    Escribe la base de la versión en preparación.
+
+    temporal:  directorio de la versión nueva (con los CSV ya escritos).
+    sesiones:  manifiesto["sesiones"], ya ordenadas.
+    anterior:  directorio de la versión vigente, o None.
+    cambiadas: ids de sesiones nuevas o reemplazadas en este lote.
+    """
+    destino = versiones.ruta_escritura(temporal, RUTA)
+    if anterior is not None and existe(anterior):
+        # Copia (no hard link): la base vieja sigue publicada
+        shutil.copyfile(Path(anterior) / RUTA, destino)
+
+    with closing(sqlite3.connect(destino)) as con, con:
+        con.executescript(ESQUEMA)
+        con.execute("INSERT OR IGNORE INTO categorias VALUES " + ",".join(["(?, ?, ?)"] * agregados.CATEGORIAS.size), [
+            x
+            for i, v1 in enumerate(agregados.ESTADOS_EXT)
+            for j, v2 in enumerate(agregados.ESTADOS_EXT)
+            for x in (v1, v2, agregados.CATEGORIAS[i, j])
+        ])
+
+        vigentes = {s["id"] for s in sesiones}
+        ya_cargadas = {fila[0] for fila in con.execute("SELECT DISTINCT sesion FROM votos")}
+        borrar = (ya_cargadas - vigentes) | (ya_cargadas & set(cambiadas))
+        cargar = [s for s in sesiones if s["id"] in borrar or s["id"] not in ya_cargadas]
+
+        con.executemany("DELETE FROM votos WHERE sesion = ?", [(s,) for s in borrar])
+        for sesion in cargar:
+            tabla = pd.read_csv(Path(temporal) / sesion["archivo"], dtype=str)
+            tabla = tabla.drop_duplicates("nombre", keep="last")
+            con.executemany(
+                "INSERT INTO votos VALUES (?, ?, ?, ?, ?)",
+                zip(
+                    [sesion["id"]] * len(tabla),
+                    tabla["nombre"],
+                    tabla["bloque"].where(tabla["bloque"].notna(), None),
+                    tabla["bloque"].map(normalizar_bloque).where(tabla["bloque"].notna(), None),
+                    [agregados.ESTADOS_EXT[c] for c in agregados.codificar_votos(tabla["voto"])],
+                ),
+            )
+
+        # El orden cambia cuando llega una sesión con fecha anterior: la
+        # tabla de sesiones es chica y se reescribe entera
+        con.execute("DELETE FROM sesiones")
+        con.executemany("INSERT INTO sesiones VALUES (?, ?, ?, ?, ?, ?)", [
+            (s["id"], orden, s.get("fecha"), s.get("evento"), s.get("iniciativa"), s["titulo"])
+            for orden, s in enumerate(sesiones)
+        ])
+        con.execute("ANALYZE")
+
+
+# ====== Consultas ======
+
+def conectar(directorio):
+    """Conexión de sólo lectura a la base de una versión publicada."""
+    uri = (Path(directorio) / RUTA).resolve().as_uri() + "?mode=ro&immutable=1"
+    return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+
+def consultar(directorio, sql, params=()):
+    """Cualquier SELECT sobre la base, como DataFrame."""
+    with closing(conectar(directorio)) as con:
+        return pd.read_sql_query(sql, con, params=params)
+
+
+def _filtros(condiciones):
+    return (" AND " + " AND ".join(c for c, _ in condiciones)) if condiciones else "", [
+        p for _, ps in condiciones for p in ps
+    ]
+
+
+def por_partes(directorio, sql, params=(), tam=50_000):
+    """
+    Mismo SELECT que consultar(), pero de a `tam` filas: un generador de
+    DataFrames que nunca tiene el resultado completo en memoria. Siempre
+    entrega al menos uno (vacío, con las columnas) para que las
+    exportaciones sepan el encabezado.
+    """
+    with closing(conectar(directorio)) as con:
+        cursor = con.execute(sql, params)
+        columnas = [d[0] for d in cursor.description]
+        vacio = True
+        while filas := cursor.fetchmany(tam):
+            vacio = False
+            yield pd.DataFrame(filas, columns=columnas)
+        if vacio:
+            yield pd.DataFrame(columns=columnas)
+
+
+def _sql_votos_unidos(sesion_1, sesion_2, bloque=None, categorias=None, voto_2=None):
+    condiciones = []
+    if bloque not in (None, "TODOS"):
+        condiciones.append(("v1.bloque_norm = ?", [bloque]))
+    if categorias is not None:
+        condiciones.append((f"c.categoria_cambio IN ({','.join('?' * len(categorias))})", list(categorias)))
+    if voto_2 not in (None, "Todos"):
+        condiciones.append(("v2.voto = ?", [normalizar_estado(voto_2)]))
+    where, params = _filtros(condiciones)
+
+    return f"""
+        SELECT v1.nombre, v1.bloque AS bloque_1, v1.voto AS voto_1, v2.voto AS voto_2,
+               v1.bloque_norm, c.categoria_cambio
+        FROM votos v1
+        JOIN votos v2 ON v2.nombre = v1.nombre AND v2.sesion = ?
+        JOIN categorias c ON c.voto_1 = v1.voto AND c.voto_2 = v2.voto
+        WHERE v1.sesion = ?{where}
+        ORDER BY v1.bloque, v1.nombre
+    """, [sesion_2, sesion_1, *params]
+
+
+def votos_unidos(directorio, sesion_1, sesion_2, bloque=None, categorias=None, voto_2=None):
+    """
+    Detalle de diputados entre dos sesiones (nombre, bloque_1, voto_1,
+    voto_2, bloque_norm, categoria_cambio), con los mismos filtros que las
+    tablas del dashboard. None = sin filtro.
+    """
+    return consultar(directorio, *_sql_votos_unidos(sesion_1, sesion_2, bloque, categorias, voto_2))
+
+
+def votos_unidos_por_partes(directorio, sesion_1, sesion_2, bloque=None, categorias=None,
+                            voto_2=None, tam=50_000):
+    """votos_unidos() de a `tam` filas (ver por_partes)."""
+    return por_partes(directorio, *_sql_votos_unidos(sesion_1, sesion_2, bloque, categorias, voto_2), tam=tam)
+
+
+def votos_por_partes(directorio, bloque=None, voto=None, ultimas=None, tam=50_000):
+    """
+    Extracto de varias sesiones: un voto por fila (orden, sesion, titulo,
+    nombre, bloque, bloque_norm, voto) de las últimas `ultimas` sesiones
+    (todas si es None), opcionalmente de un bloque y un voto, de a `tam` filas.
+    """
+    condiciones = []
+    if bloque not in (None, "TODOS"):
+        condiciones.append(("v.bloque_norm = ?", [bloque]))
+    if voto not in (None, "Todos"):
+        condiciones.append(("v.voto = ?", [normalizar_estado(voto)]))
+    where, params = _filtros(condiciones)
+
+    return por_partes(directorio, f"""
+        WITH ultimas AS (
+            SELECT id FROM sesiones ORDER BY orden DESC LIMIT ?
+        )
+        SELECT s.orden, s.id AS sesion, s.titulo, v.nombre, v.bloque, v.bloque_norm, v.voto
+        FROM votos v JOIN sesiones s ON s.id = v.sesion
+        WHERE v.sesion IN ultimas{where}
+        ORDER BY s.orden, v.nombre
+    """, [-1 if ultimas is None else ultimas, *params], tam=tam)
+
+
+def categorias_presentes(directorio, sesion_1, sesion_2, bloque=None):
+    """Categorías de cambio que aparecen entre dos sesiones (para los filtros)."""
+    condicion_bloque, params_bloque = _filtros(
+        [("v1.bloque_norm = ?", [bloque])] if bloque not in (None, "TODOS") else []
+    )
+    return consultar(directorio, f"""
+        SELECT DISTINCT c.categoria_cambio
+        FROM votos v1
+        JOIN votos v2 ON v2.nombre = v1.nombre AND v2.sesion = ?
+        JOIN categorias c ON c.voto_1 = v1.voto AND c.voto_2 = v2.voto
+        WHERE v1.sesion = ?{condicion_bloque}
+        ORDER BY 1
+    """, [sesion_2, sesion_1, *params_bloque])["categoria_cambio"].tolist()
+
+
+def reincidentes(directorio, voto, minimo, ultimas=None, bloque=None):
+    """
+    Diputados que votaron `voto` en al menos `minimo` de las últimas
+    `ultimas` sesiones (todas si es None), opcionalmente de un bloque.
+    Devuelve nombre, bloque_norm, veces y sesiones (cuántas de esas
+    sesiones tuvo cada uno).
+    """
+    condicion_bloque, params_bloque = _filtros(
+        [("bloque_norm = ?", [bloque])] if bloque not in (None, "TODOS") else []
+    )
+    return consultar(directorio, f"""
+        WITH ultimas AS (
+            SELECT id FROM sesiones ORDER BY orden DESC LIMIT ?
+        )
+        SELECT nombre, MAX(bloque_norm) AS bloque_norm,
+               SUM(voto = ?) AS veces, COUNT(*) AS sesiones
+        FROM votos
+        WHERE sesion IN ultimas{condicion_bloque}
+        GROUP BY nombre
+        HAVING SUM(voto = ?) >= ?
+        ORDER BY veces DESC, nombre
+    """, [-1 if ultimas is None else ultimas, voto, *params_bloque, voto, minimo])
+
+
+def historial(directorio, nombre):
+    """Todos los votos de un diputado, en orden de sesión."""
+    return consultar(directorio, """
+        SELECT s.orden, s.id AS sesion, s.titulo, v.bloque, v.voto
+        FROM votos v JOIN sesiones s ON s.id = v.sesion
+        WHERE v.nombre = ?
+        ORDER BY s.orden
+    """, [nombre])
+
+
+def bloques(directorio):
+    return consultar(directorio, """
+        SELECT DISTINCT bloque_norm FROM votos WHERE bloque_norm IS NOT NULL ORDER BY 1
+    """)["bloque_norm"].tolist()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Exportación de la vista filtrada del dashboard a CSV, Parquet o XLSX.
+
+Los datos llegan como un iterable de DataFrames (ver
+consultas.por_partes) y cada parte se escribe al archivo apenas llega:
+nunca se arma la tabla completa en memoria, así que un extracto de muchas
+sesiones pesa lo mismo que una comparación. XLSX es el formato más lento
+(openpyxl en modo write_only, fila por fila); para extractos grandes
+conviene CSV o Parquet.
+
+Cada exportación queda en disco con una llave que resume lo que se pidió
+(versión, tipo de vista y filtros); si alguien pide exactamente lo mismo
+se devuelve el archivo ya generado. Las de una versión se borran junto
+con ella (versiones.limpiar_versiones).
+
+Límite: lo que se hace de a partes es generar el archivo. Para servirlo,
+st.download_button guarda el archivo completo en memoria (su
+MediaFileManager) mientras dure la descarga; un extracto muy grande pesa
+en el servidor lo que pesa el archivo, no lo que pesaría la tabla.
+
+    ruta = exportar(directorio, llave("comparacion", version, filtros), "parquet",
+                    lambda: consultas.votos_unidos_por_partes(...))
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+FORMATOS = {
+    "csv": ("CSV", "text/csv"),
+    "parquet": ("Parquet", "application/vnd.apache.parquet"),
+    "xlsx": ("Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+TAM_PARTE = 50_000
+
+# Filas por hoja de Excel (sin contar el encabezado); si hay más, sigue en otra hoja
+MAX_FILAS_XLSX = 1_048_575
+
+
+def llave(*partes):
+    """Nombre de archivo estable para una combinación de vista y filtros."""
+    texto = json.dumps(partes, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:24]
+
+
+def partes_de(df, tam=TAM_PARTE):
+    """Un DataFrame que ya está en memoria, de a `tam` filas."""
+    for inicio in range(0, max(len(df), 1), tam):
+        yield df.iloc[inicio:inicio + tam]
+
+
+def renombrar(partes, columnas):
+    """Deja sólo `columnas` (dict origen -> encabezado) en cada parte, en ese orden."""
+    for parte in partes:
+        yield parte[list(columnas)].rename(columns=columnas)
+
+
+# ====== Escritores ======
+
+def _csv(partes, ruta):
+    # utf-8-sig: Excel abre bien los acentos de nombres y bloques
+    with open(ruta, "w", encoding="utf-8-sig", newline="") as f:
+        for i, parte in enumerate(partes):
+            parte.to_csv(f, header=i == 0, index=False)
+
+
+def _parquet(partes, ruta):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    escritor = None
+    try:
+        for parte in partes:
+            tabla = pa.Table.from_pandas(parte, preserve_index=False)
+            if escritor is None:
+                # Las columnas que llegan vacías en la primera parte quedan como texto
+                esquema = pa.schema([
+                    c.with_type(pa.string()) if pa.types.is_null(c.type) else c
+                    for c in tabla.schema
+                ]).remove_metadata()
+                escritor = pq.ParquetWriter(ruta, esquema)
+            # Cada parte es un row group; se castea al esquema de la primera
+            escritor.write_table(tabla.cast(escritor.schema, safe=False))
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+
+def _xlsx(partes, ruta):
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    hoja, filas, encabezado = None, MAX_FILAS_XLSX, None
+    for parte in partes:
+        if encabezado is None:
+            encabezado = [str(c) for c in parte.columns]
+        valores = parte.astype(object).where(parte.notna(), None).itertuples(index=False, name=None)
+        for fila in valores:
+            if filas >= MAX_FILAS_XLSX:
+                hoja = libro.create_sheet(f"Datos_{len(libro.sheetnames) + 1}" if hoja else "Datos")
+                hoja.append(encabezado)
+                filas = 0
+            hoja.append(fila)
+            filas += 1
+        if hoja is None:
+            hoja = libro.create_sheet("Datos")
+            hoja.append(encabezado)
+    libro.save(ruta)
+
+
+ESCRITORES = {"csv": _csv, "parquet": _parquet, "xlsx": _xlsx}
+
+
+# ====== Exportación cacheada ======
+
+def exportar(directorio, clave, formato, generar_partes):
+    """
+    Ruta del archivo `<clave>.<formato>` en `directorio`, generándolo desde
+    generar_partes() (una función sin argumentos que devuelve el iterable de
+    partes) sólo si todavía no existe. Se escribe a un temporal y se
+    renombra, así que dos pedidos simultáneos nunca ven un archivo a medias.
+    """
+    if formato not in ESCRITORES:
+        raise ValueError(f"Formato desconocido: {formato}")
+    directorio = Path(directorio)
+    ruta = directorio / f"{clave}.{formato}"
+    if ruta.exists():
+        return ruta
+
+    directorio.mkdir(parents=True, exist_ok=True)
+    temporal = directorio / f".{clave}.{os.getpid()}-{threading.get_ident()}.{formato}"
+    try:
+        ESCRITORES[formato](generar_partes(), temporal)
+        os.replace(temporal, ruta)
+    finally:
+        temporal.unlink(missing_ok=True)
+    return ruta
+
+
+def contenido(directorio, clave, formato, generar_partes):
+    """Bytes del archivo de exportar() (lo que necesita st.download_button)."""
+    with open(exportar(directorio, clave, formato, generar_partes), "rb") as f:
+        return f.read()
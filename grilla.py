@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Grilla diputado × sesión de toda la legislatura, agregada en el servidor.
+
+La matriz completa (ver matriz.py) puede tener decenas de miles de celdas;
+mandarla tal cual como heatmap de Plotly congela el navegador. En vez de
+eso se manda sólo lo que cabe en el gráfico: la región visible se parte en
+a lo sumo max_filas × max_columnas casillas y de cada una se manda el
+balance (A FAVOR - EN CONTRA) / presentes y la proporción de cada voto.
+Cuando la región visible es chica, cada casilla es una celda y se ve el
+voto individual.
+
+Filas: por bloque (los bloques ordenados por su perfil promedio) y, dentro
+de cada bloque, por el perfil de voto de cada diputado, que es su
+coordenada en la primera componente principal de la matriz +1 / -1 / 0.
+Así los diputados que votan parecido quedan juntos. Las sesiones van en
+orden cronológico u ordenadas por la misma componente.
+"""
+
+import numpy as np
+
+import matriz
+from analisis import ESTADOS
+
+_FAVOR = ESTADOS.index("A FAVOR")
+_CONTRA = ESTADOS.index("EN CONTRA")
+N_ESTADOS = len(ESTADOS)
+
+ORDEN_BLOQUE = "Bloque y perfil de voto"
+ORDEN_PERFIL = "Perfil de voto"
+ORDENES = [ORDEN_BLOQUE, ORDEN_PERFIL]
+
+# Resolución a la que se agrega: tamaño del gráfico y píxeles mínimos por casilla
+ALTO_PX = 720
+ANCHO_PX = 1200
+PX_POR_CASILLA = 3
+MAX_FILAS = ALTO_PX // PX_POR_CASILLA
+MAX_COLUMNAS = ANCHO_PX // PX_POR_CASILLA
+
+
+# ====== Orden ======
+
+def _valores(votos):
+    """+1 A FAVOR, -1 EN CONTRA, 0 el resto (incluye no estar en la sesión)."""
+    x = np.zeros(votos.shape, dtype=np.float32)
+    x[votos == _FAVOR] = 1
+    x[votos == _CONTRA] = -1
+    return x
+
+
+def perfiles(votos):
+    """
+    Primera componente principal de filas y columnas de la matriz de
+    votos: (puntaje por diputado, puntaje por sesión). El signo se fija
+    para que un puntaje alto sea votar más A FAVOR.
+    """
+    x = _valores(votos)
+    if min(x.shape) < 2:
+        return x.mean(axis=1), x.mean(axis=0)
+    centrada = x - x.mean(axis=0)
+    u, s, vt = np.linalg.svd(centrada, full_matrices=False)
+    filas, columnas = u[:, 0] * s[0], vt[0]
+    if np.dot(filas, x.sum(axis=1)) < 0:
+        filas, columnas = -filas, -columnas
+    return filas, columnas
+
+
+def bloque_actual(m):
+    """Bloque normalizado de cada diputado en la última sesión en que aparece."""
+    bloques = np.asarray(m["bloques_m"])
+    presente = bloques != matriz.SIN_DATO
+    ultima = np.where(presente.any(axis=1), bloques.shape[1] - 1 - np.argmax(presente[:, ::-1], axis=1), 0)
+    codigos = bloques[np.arange(len(bloques)), ultima] if bloques.size else np.array([], dtype=int)
+    etiquetas = np.append(m["bloques_norm"], "SIN BLOQUE").astype(object)
+    return etiquetas[codigos]
+
+
+def ordenar(m, orden=ORDEN_BLOQUE, sesiones_por_perfil=False):
+    """
+    Devuelve (filas, columnas, bloques): el orden de los índices de
+    diputados y sesiones, y el bloque de cada fila ya ordenada.
+    """
+    votos = np.asarray(m["votos"])
+    puntaje_filas, puntaje_columnas = perfiles(votos)
+    bloques = bloque_actual(m)
+
+    if orden == ORDEN_BLOQUE and len(bloques):
+        _, codigos = np.unique(bloques, return_inverse=True)
+        promedio = np.bincount(codigos, puntaje_filas) / np.bincount(codigos)
+        rango_bloque = np.argsort(np.argsort(promedio))
+        filas = np.lexsort((puntaje_filas, rango_bloque[codigos]))
+    else:
+        filas = np.argsort(puntaje_filas, kind="stable")
+
+    if sesiones_por_perfil:
+        columnas = np.argsort(puntaje_columnas, kind="stable")
+    else:
+        columnas = np.arange(votos.shape[1])
+
+    return filas, columnas, bloques[filas]
+
+
+# ====== Agregación a la resolución del gráfico ======
+
+def _cortes(n, maximo):
+    """Inicio de cada casilla al partir n elementos en a lo sumo `maximo`."""
+    return np.unique(np.linspace(0, n, min(n, maximo) + 1).astype(int)[:-1])
+
+
+def _etiquetas(nombres, cortes, n):
+    finales = np.append(cortes[1:], n) - 1
+    return [
+        str(nombres[i]) if i == f else f"{nombres[i]} … {nombres[f]} ({f - i + 1})"
+        for i, f in zip(cortes, finales)
+    ]
+
+
+def vista(m, filas, columnas, rango_filas, rango_columnas, max_filas=MAX_FILAS,
+          max_columnas=MAX_COLUMNAS, etiquetas_filas=None, etiquetas_columnas=None):
+    """
+    Agrega la región visible [f0, f1) × [c0, c1) (en el orden dado por
+    `filas` / `columnas`) a lo sumo en max_filas × max_columnas casillas.
+
+    Devuelve un dict con:
+        balance      (casillas_f, casillas_c) en [-1, 1], NaN sin votos
+        proporciones (casillas_f, casillas_c, 4) de cada voto en ESTADOS
+        filas, columnas   etiquetas de cada casilla
+        celdas_por_casilla (filas, columnas) de la casilla más grande
+
+    etiquetas_filas / etiquetas_columnas, si se dan, van ya en ese orden.
+    La región tiene que tener al menos una fila y una columna.
+    """
+    f0, f1 = rango_filas
+    c0, c1 = rango_columnas
+    if f1 <= f0 or c1 <= c0:
+        raise ValueError(f"Región vacía: filas {rango_filas}, columnas {rango_columnas}")
+    region = np.asarray(m["votos"])[np.ix_(filas[f0:f1], columnas[c0:c1])]
+
+    cortes_f = _cortes(f1 - f0, max_filas)
+    cortes_c = _cortes(c1 - c0, max_columnas)
+
+    # Conteo de cada voto por casilla: one-hot y dos reduceat (sin bucles)
+    una_caliente = (region[..., None] == np.arange(N_ESTADOS)).astype(np.int32)
+    conteos = np.add.reduceat(np.add.reduceat(una_caliente, cortes_f, axis=0), cortes_c, axis=1)
+
+    presentes = conteos.sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        balance = np.where(presentes > 0, (conteos[..., _FAVOR] - conteos[..., _CONTRA]) / presentes, np.nan)
+        proporciones = np.where(presentes[..., None] > 0, conteos / presentes[..., None], np.nan)
+
+    if etiquetas_filas is None:
+        etiquetas_filas = m["diputados"][filas]
+    if etiquetas_columnas is None:
+        etiquetas_columnas = np.array(m["sesiones"], dtype=object)[columnas]
+
+    return {
+        "balance": balance,
+        "proporciones": proporciones,
+        "filas": _etiquetas(np.asarray(etiquetas_filas)[f0:f1], cortes_f, f1 - f0),
+        "columnas": _etiquetas(np.asarray(etiquetas_columnas)[c0:c1], cortes_c, c1 - c0),
+        "celdas_por_casilla": (
+            int(np.diff(np.append(cortes_f, f1 - f0)).max(initial=1)),
+            int(np.diff(np.append(cortes_c, c1 - c0)).max(initial=1)),
+        ),
+    }
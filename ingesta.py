@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Daemon de ingesta: vigila datos/entrada/ y publica cada PDF de votación
+nominal como una nueva versión del dataset (ver versiones.py).
+
+    python ingesta.py                  # vigila hasta Ctrl+C
+    python ingesta.py --una-vez        # procesa lo que haya y termina
+
+Un archivo se procesa cuando su tamaño y fecha de modificación no cambian
+durante --espera segundos, para no leer PDFs a medio copiar. La extracción
+y el análisis corren en un pool de --trabajadores procesos; la publicación
+es siempre secuencial.
+"""
+
+import argparse
+import os
+import shutil
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+import agregados
+import analisis
+import consultas
+import intervalos
+import matriz
+import pdf_excel
+import versiones
+
+# Archivos que todavía se están copiando o que deja Office abiertos
+PREFIJOS_IGNORADOS = (".", "~$")
+SUFIJOS_IGNORADOS = (".part", ".tmp", ".crdownload")
+
+
+def log(msg):
+    print(f"[{datetime.now():%H:%M:%S}] {msg}", flush=True)
+
+
+# ====== Debounce del buzón ======
+
+def archivos_listos(entrada, vistos, espera):
+    """
+    Revisa el buzón y devuelve los PDFs cuyo (tamaño, mtime) lleva al
+    menos `espera` segundos sin cambiar. `vistos` guarda el estado entre
+    llamadas: {ruta: (tamaño, mtime_ns, desde)}.
+    """
+    ahora = time.monotonic()
+    presentes = set()
+    listos = []
+
+    for ruta in sorted(Path(entrada).iterdir()):
+        nombre = ruta.name
+        if (not ruta.is_file() or nombre.startswith(PREFIJOS_IGNORADOS)
+                or nombre.lower().endswith(SUFIJOS_IGNORADOS)
+                or not nombre.lower().endswith(".pdf")):
+            continue
+        try:
+            st = ruta.stat()
+        except FileNotFoundError:
+            continue
+        presentes.add(ruta)
+        firma = (st.st_size, st.st_mtime_ns)
+
+        previo = vistos.get(ruta)
+        if previo is None or previo[:2] != firma:
+            vistos[ruta] = (*firma, ahora)
+        elif st.st_size > 0 and ahora - previo[2] >= espera:
+            listos.append(ruta)
+
+    for ruta in list(vistos):
+        if ruta not in presentes:
+            del vistos[ruta]
+
+    return listos
+
+
+# ====== Trabajo que corre en el pool ======
+
+def procesar_pdf(pdf_path):
+    """Extrae y estandariza la votación de un PDF. Devuelve (metadatos, votos)."""
+    metadatos, tabla = pdf_excel.extraer_votacion(Path(pdf_path))
+    votos = analisis.estandarizar_votacion(tabla, nombre_ronda=None)
+    return metadatos, votos.drop(columns="ronda")
+
+
+def analizar_par(csv_1, csv_2, destino, destino_agregado, destino_intervalos):
+    """
+    Genera el libro de análisis de dos sesiones publicadas (como
+    votaciones.ipynb), el tensor de conteos del par (ver agregados.py) y
+    sus intervalos de confianza (ver intervalos.py).
+    """
+    v1 = pd.read_csv(csv_1, dtype=str).assign(ronda="primera")
+    v2 = pd.read_csv(csv_2, dtype=str).assign(ronda="segunda")
+    merged = analisis.unir_votaciones(v1, v2)
+    agregado = agregados.tensor_desde_merged(merged)
+    # Ya corre dentro del pool: el bootstrap del par va en este mismo proceso
+    ic = intervalos.calcular_intervalos(agregado, trabajadores=1)
+
+    hojas = analisis.analizar_votaciones(merged)
+    hojas["IC_probabilidades"] = intervalos.tabla_intervalos(ic, agregado)
+    analisis.exportar_analisis(hojas, destino)
+    agregados.guardar(agregado, destino_agregado)
+    intervalos.guardar(ic, destino_intervalos)
+    return destino
+
+
+# ====== Sesiones y comparaciones ======
+
+def _slug(texto):
+    texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode()
+    return "-".join("".join(c if c.isalnum() else " " for c in texto.lower()).split())
+
+
+def describir_sesion(metadatos, pdf_path):
+    """Entrada del manifiesto para una sesión recién extraída."""
+    pdf_path = Path(pdf_path)
+    fecha = metadatos.get("fecha")
+    evento = metadatos.get("evento")
+
+    if fecha and evento is not None:
+        sesion_id = f"{datetime.fromisoformat(fecha):%Y%m%d-%H%M%S}-ev{evento}"
+        titulo = f"Evento #{evento}"
+        if metadatos.get("iniciativa"):
+            titulo += f" - Iniciativa {metadatos['iniciativa']}"
+        titulo += f" ({datetime.fromisoformat(fecha):%d/%m/%Y %H:%M})"
+    else:
+        sesion_id = _slug(pdf_path.stem)
+        titulo = pdf_path.stem
+
+    return {
+        "id": sesion_id,
+        "titulo": titulo,
+        "archivo": f"sesiones/{sesion_id}.csv",
+        "origen": pdf_path.name,
+        "ingresada": datetime.now().isoformat(timespec="seconds"),
+        **metadatos,
+    }
+
+
+def ordenar_sesiones(sesiones):
+    # Por fecha del evento; las que no traen fecha van al final en orden de llegada
+    return sorted(sesiones, key=lambda s: (s.get("fecha") is None, s.get("fecha") or "", s["ingresada"]))
+
+
+def comparaciones_consecutivas(sesiones):
+    """Una comparación por cada par de sesiones consecutivas."""
+    pares = []
+    for s1, s2 in zip(sesiones, sesiones[1:]):
+        par_id = f"{s1['id']}__{s2['id']}"
+        pares.append({
+            "id": par_id,
+            "sesion_1": s1["id"],
+            "sesion_2": s2["id"],
+            "titulo": f"{s1['titulo']} vs {s2['titulo']}",
+            "archivo": f"analisis/{par_id}.xlsx",
+        })
+    return pares
+
+
+# ====== Lote ======
+
+def _mover(ruta, carpeta):
+    carpeta.mkdir(parents=True, exist_ok=True)
+    destino = carpeta / ruta.name
+    if destino.exists():
+        destino = carpeta / f"{ruta.stem}-{datetime.now():%Y%m%d%H%M%S}{ruta.suffix}"
+    shutil.move(str(ruta), destino)
+
+
+def procesar_lote(pdfs, pool, base=None):
+    """Extrae, analiza y publica un grupo de PDFs como una sola versión nueva."""
+    base = versiones.directorio_datos(base)
+    anterior = versiones.version_actual(base)
+
+    futuros = [(pdf, pool.submit(procesar_pdf, str(pdf))) for pdf in pdfs]
+    extraidos = []
+    for pdf, futuro in futuros:
+        try:
+            extraidos.append((pdf, *futuro.result()))
+        except Exception as e:
+            log(f"[ERROR] {pdf.name}: {e}")
+            _mover(pdf, base / "errores")
+
+    if not extraidos:
+        return None
+
+    temporal, manifiesto = versiones.preparar_version(base)
+    try:
+        sesiones = {s["id"]: s for s in manifiesto["sesiones"]}
+        for pdf, metadatos, votos in extraidos:
+            sesion = describir_sesion(metadatos, pdf)
+            if sesion["id"] in sesiones:
+                log(f"{pdf.name}: reemplaza la sesión {sesion['id']}")
+                sesion["ingresada"] = sesiones[sesion["id"]]["ingresada"]
+            votos.to_csv(versiones.ruta_escritura(temporal, sesion["archivo"]), index=False)
+            sesiones[sesion["id"]] = sesion
+
+        manifiesto["sesiones"] = ordenar_sesiones(sesiones.values())
+        anterior_dir = versiones.ruta_version(anterior, base) if anterior else None
+
+        # Matriz codificada que el dashboard mapea en memoria (ver matriz.py)
+        nuevas = {describir_sesion(m, pdf)["id"] for pdf, m, _ in extraidos}
+        matriz.actualizar(temporal, manifiesto["sesiones"], anterior_dir, cambiadas=nuevas)
+        # ... y la base SQLite para consultas entre sesiones (ver consultas.py)
+        consultas.actualizar(temporal, manifiesto["sesiones"], anterior_dir, cambiadas=nuevas)
+
+        # Sólo se analizan los pares nuevos, los que tocan una sesión
+        # reemplazada y los que todavía no tienen tensor de agregados o
+        # intervalos
+        existentes = {c["id"] for c in manifiesto["comparaciones"]}
+        comparaciones = comparaciones_consecutivas(manifiesto["sesiones"])
+        pendientes = [
+            c for c in comparaciones
+            if c["id"] not in existentes
+            or {c["sesion_1"], c["sesion_2"]} & nuevas
+            or not (temporal / agregados.ruta_par(c["id"])).exists()
+            or not (temporal / intervalos.ruta_par(c["id"])).exists()
+        ]
+
+        archivos = {s["id"]: str(temporal / s["archivo"]) for s in manifiesto["sesiones"]}
+        futuros = [
+            pool.submit(
+                analizar_par,
+                archivos[c["sesion_1"]],
+                archivos[c["sesion_2"]],
+                str(versiones.ruta_escritura(temporal, c["archivo"])),
+                str(versiones.ruta_escritura(temporal, agregados.ruta_par(c["id"]))),
+                str(versiones.ruta_escritura(temporal, intervalos.ruta_par(c["id"]))),
+            )
+            for c in pendientes
+        ]
+        for futuro in futuros:
+            futuro.result()
+
+        # Los análisis de pares que dejaron de ser consecutivos ya no se publican
+        vigentes = {c["id"] for c in comparaciones}
+        retiradas = [c for c in manifiesto["comparaciones"] if c["id"] not in vigentes]
+        for c in retiradas:
+            (temporal / c["archivo"]).unlink(missing_ok=True)
+            (temporal / agregados.ruta_par(c["id"])).unlink(missing_ok=True)
+            (temporal / intervalos.ruta_par(c["id"])).unlink(missing_ok=True)
+        manifiesto["comparaciones"] = comparaciones
+
+        total = agregados.actualizar_total(
+            temporal,
+            anterior_dir,
+            quitar=[c["id"] for c in retiradas + pendientes],
+            agregar=[c["id"] for c in pendientes],
+        )
+        # Las réplicas del total no se pueden sumar por pares (cada una es
+        # una muestra independiente), así que se recalculan sobre el tensor
+        # total repartiendo los lotes en el mismo pool
+        intervalos.guardar(
+            intervalos.calcular_intervalos(total, pool=pool),
+            versiones.ruta_escritura(temporal, intervalos.RUTA_TOTAL),
+        )
+
+        version = versiones.confirmar_version(temporal, manifiesto, base)
+    except Exception:
+        versiones.descartar_version(temporal)
+        raise
+
+    for pdf, _, _ in extraidos:
+        _mover(pdf, base / "procesados")
+
+    log(f"Versión {version} publicada: {len(extraidos)} sesión(es) nueva(s), "
+        f"{len(pendientes)} comparación(es) recalculada(s)")
+    return version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vigila el buzón de PDFs y publica el dataset.")
+    parser.add_argument("--datos", default=str(versiones.DATOS_DIR),
+                        help="directorio raíz de datos (default: %(default)s)")
+    parser.add_argument("--intervalo", type=float, default=1.0,
+                        help="segundos entre revisiones del buzón")
+    parser.add_argument("--espera", type=float, default=2.0,
+                        help="segundos sin cambios antes de procesar un archivo")
+    parser.add_argument("--trabajadores", type=int, default=min(4, os.cpu_count() or 1),
+                        help="procesos para extracción y análisis")
+    parser.add_argument("--una-vez", action="store_true",
+                        help="procesar lo que haya en el buzón y terminar")
+    args = parser.parse_args()
+
+    base = Path(args.datos)
+    entrada = base / "entrada"
+    entrada.mkdir(parents=True, exist_ok=True)
+
+    log(f"Vigilando {entrada} con {args.trabajadores} trabajador(es)")
+    vistos = {}
+    with ProcessPoolExecutor(max_workers=args.trabajadores) as pool:
+        try:
+            while True:
+                listos = archivos_listos(entrada, vistos, args.espera)
+                if listos:
+                    try:
+                        procesar_lote(listos, pool, base)
+                    except Exception as e:
+                        log(f"[ERROR] No se pudo publicar el lote: {e}")
+                        for pdf in listos:
+                            if pdf.exists():
+                                _mover(pdf, base / "errores")
+                    for pdf in listos:
+                        vistos.pop(pdf, None)
+                elif args.una_vez and not vistos:
+                    break
+                time.sleep(args.intervalo)
+        except KeyboardInterrupt:
+            log("Detenido")
+
+
+if __name__ == "__main__":
+    main()
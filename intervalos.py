@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Intervalos de confianza bootstrap para las probabilidades de transición.
+
+Se parte del tensor de conteos de agregados.py (bloque × voto_1 × voto_2)
+y, para cada bloque y cada voto_1, se vuelve a muestrear la fila completa
+con una multinomial del mismo tamaño. Todas las filas de todos los bloques
+se muestrean en una sola llamada vectorizada, con la matriz global
+agregada como un bloque más.
+
+Con las proporciones observadas tal cual, un bloque chico con 0% o 100%
+tendría un intervalo de ancho cero, que es justo la lectura que se quiere
+evitar. Por eso se muestrea desde las proporciones suavizadas con +0.5 por
+celda (Jeffreys): el estimador puntual sigue siendo el observado, pero el
+intervalo refleja lo poco que dicen 2 o 3 diputados.
+
+Las réplicas se reparten en lotes de tamaño fijo, cada uno con su semilla
+derivada de la semilla principal, así que el resultado es el mismo sin
+importar cuántos procesos se usen.
+"""
+
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import agregados
+from analisis import ESTADOS
+
+N_REPLICAS = 2000
+NIVEL = 0.95
+SEMILLA = 20251118
+
+# Réplicas por lote (la unidad que se reparte entre procesos)
+TAM_LOTE = 250
+
+SUAVIZADO = 0.5
+
+
+def ruta_par(par_id):
+    return f"intervalos/{par_id}.npz"
+
+
+RUTA_TOTAL = "intervalos/total.npz"
+
+
+def _filas(agregado):
+    """Conteos ESTADOS × ESTADOS por bloque (sin la categoría OTRO)."""
+    k = len(ESTADOS)
+    return agregado["conteos"][:, :k, :k]
+
+
+def _replicas(conteos, semilla):
+    """Un lote de réplicas: int32 con forma (TAM_LOTE, bloques, k, k)."""
+    rng = np.random.default_rng(semilla)
+    n = conteos.sum(axis=-1)
+    p = (conteos + SUAVIZADO) / (n[..., None] + SUAVIZADO * conteos.shape[-1])
+    return rng.multinomial(n, p, size=(TAM_LOTE, *n.shape)).astype(np.int32)
+
+
+def _probabilidades(conteos):
+    n = conteos.sum(axis=-1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, conteos / n, np.nan)
+
+
+def calcular_intervalos(agregado, n_replicas=N_REPLICAS, nivel=NIVEL,
+                        semilla=SEMILLA, trabajadores=None, pool=None):
+    """
+    Devuelve un dict con, por bloque y global, la probabilidad observada y
+    los límites del intervalo (arrays k × k, con NaN en filas sin diputados):
+
+        bloques, p, inferior, superior                # (bloques, k, k)
+        p_global, inferior_global, superior_global    # (k, k)
+
+    Los lotes se reparten en `pool` si se da; si no, en un pool propio de
+    `trabajadores` procesos (1 = todo en este proceso).
+    """
+    conteos = _filas(agregado)
+    # El global va como un bloque más al final: se suaviza con sus propios
+    # totales (sumar réplicas suavizadas de cada bloque lo sesgaría)
+    con_global = np.concatenate([conteos, conteos.sum(axis=0, keepdims=True)])
+    n_lotes = max(1, -(-n_replicas // TAM_LOTE))
+    semillas = np.random.SeedSequence(semilla).spawn(n_lotes)
+
+    if trabajadores is None:
+        trabajadores = os.cpu_count() or 1
+
+    if pool is not None:
+        lotes = list(pool.map(_replicas, [con_global] * n_lotes, semillas))
+    elif trabajadores > 1 and n_lotes > 1:
+        with ProcessPoolExecutor(max_workers=min(trabajadores, n_lotes)) as propio:
+            lotes = list(propio.map(_replicas, [con_global] * n_lotes, semillas))
+    else:
+        lotes = [_replicas(con_global, s) for s in semillas]
+
+    replicas = np.concatenate(lotes)[:n_replicas]
+    cola = (1 - nivel) / 2 * 100
+
+    with warnings.catch_warnings():
+        # filas sin diputados: todo NaN, es lo esperado
+        warnings.simplefilter("ignore", RuntimeWarning)
+        inferior, superior = np.nanpercentile(
+            _probabilidades(replicas), [cola, 100 - cola], axis=0
+        )
+    p = _probabilidades(con_global)
+
+    return {
+        "bloques": list(agregado["bloques"]),
+        "p": p[:-1],
+        "inferior": inferior[:-1],
+        "superior": superior[:-1],
+        "p_global": p[-1],
+        "inferior_global": inferior[-1],
+        "superior_global": superior[-1],
+        "n_replicas": n_replicas,
+        "nivel": nivel,
+        "semilla": semilla,
+    }
+
+
+# ====== Persistencia (una vez por versión) ======
+
+def guardar(ic, ruta):
+    datos = dict(ic)
+    datos["bloques"] = np.array(ic["bloques"], dtype=str)
+    np.savez(ruta, **datos)
+
+
+def cargar(ruta):
+    with np.load(ruta) as z:
+        ic = {k: z[k] for k in z.files}
+    ic["bloques"] = ic["bloques"].tolist()
+    for k in ("n_replicas", "semilla"):
+        ic[k] = int(ic[k])
+    ic["nivel"] = float(ic["nivel"])
+    return ic
+
+
+# ====== Vistas ======
+
+def del_bloque(ic, bloque=None):
+    """(p, inferior, superior) k × k de un bloque, o globales si bloque es None / "TODOS"."""
+    if bloque in (None, "TODOS"):
+        return ic["p_global"], ic["inferior_global"], ic["superior_global"]
+    if bloque not in ic["bloques"]:
+        vacio = np.full((len(ESTADOS), len(ESTADOS)), np.nan)
+        return vacio, vacio, vacio
+    i = ic["bloques"].index(bloque)
+    return ic["p"][i], ic["inferior"][i], ic["superior"][i]
+
+
+def tabla_intervalos(ic, agregado):
+    """
+    Formato largo para exportar: bloque, voto_1, voto_2, conteo, probabilidad,
+    ic_inferior, ic_superior. El global va con bloque "TODOS".
+    """
+    conteos = _filas(agregado)
+    filas = []
+    for bloque, m in [("TODOS", conteos.sum(axis=0))] + list(zip(ic["bloques"], conteos)):
+        p, inf, sup = del_bloque(ic, bloque)
+        for i, v1 in enumerate(ESTADOS):
+            if m[i].sum() == 0:
+                continue
+            for j, v2 in enumerate(ESTADOS):
+                filas.append((bloque, v1, v2, int(m[i, j]), p[i, j], inf[i, j], sup[i, j]))
+    return pd.DataFrame(filas, columns=[
+        "bloque", "voto_1", "voto_2", "conteo", "probabilidad", "ic_inferior", "ic_superior",
+    ])
+
+
+def hoja_intervalos(merged, **kwargs):
+    """Atajo para el notebook / ingesta: hoja IC_probabilidades desde los votos unidos."""
+    agregado = agregados.tensor_desde_merged(merged)
+    return tabla_intervalos(calcular_intervalos(agregado, **kwargs), agregado)
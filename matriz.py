@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Matriz diputado × sesión con los votos codificados, para mapear en memoria.
+
+Cada versión publicada trae, además de los CSV por sesión:
+
+    matriz/votos.npy       # int8 (diputados, sesiones): índice en ESTADOS_EXT, -1 = no aparece
+    matriz/bloques.npy     # int16 (diputados, sesiones): índice en el catálogo, -1 = sin bloque
+    matriz/catalogo.json   # diputados, sesiones, bloques (como vienen) y bloques_norm
+
+Los .npy se abren con np.load(mmap_mode="r"): todos los procesos del
+dashboard leen las mismas páginas del cache del sistema operativo y
+ninguno tiene su propia copia de los votos. Como una versión nunca se
+modifica, cambiar de versión es sólo abrir la matriz de otra ruta; los
+procesos que todavía tienen abierta la anterior la siguen leyendo aunque
+limpiar_versiones() la borre.
+
+La matriz se arma en forma incremental: de la versión anterior se toman
+las columnas de las sesiones que no cambiaron y sólo se leen los CSV de
+las sesiones nuevas o reemplazadas.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import agregados
+import versiones
+from analisis import normalizar_bloque
+
+RUTA = "matriz"
+SIN_DATO = -1
+
+
+def _rutas(directorio):
+    d = Path(directorio) / RUTA
+    return d / "votos.npy", d / "bloques.npy", d / "catalogo.json"
+
+
+def existe(directorio):
+    return all(r.exists() for r in _rutas(directorio))
+
+
+# ====== Construcción (ingesta) ======
+
+def actualizar(temporal, sesiones, anterior=None, cambiadas=()):
+    """
+    Escribe la matriz de la versión en preparación.
+
+    temporal:  directorio de la versión nueva (con los CSV ya escritos).
+    sesiones:  manifiesto["sesiones"], en el orden de las columnas.
+    anterior:  directorio de la versión vigente, o None.
+    cambiadas: ids de sesiones nuevas o reemplazadas en este lote.
+    """
+    previa = abrir(anterior) if anterior is not None and existe(anterior) else None
+    cambiadas = set(cambiadas)
+
+    diputados = list(previa["diputados"]) if previa else []
+    bloques = list(previa["bloques"]) if previa else []
+    pos_diputado = {d: i for i, d in enumerate(diputados)}
+    pos_bloque = {b: i for i, b in enumerate(bloques)}
+    pos_sesion = {s: i for i, s in enumerate(previa["sesiones"])} if previa else {}
+
+    columnas = []
+    for sesion in sesiones:
+        if sesion["id"] in pos_sesion and sesion["id"] not in cambiadas:
+            columnas.append(("previa", pos_sesion[sesion["id"]]))
+            continue
+
+        tabla = pd.read_csv(Path(temporal) / sesion["archivo"], dtype=str)
+        tabla = tabla.drop_duplicates("nombre", keep="last")
+        for nombre in tabla["nombre"]:
+            if nombre not in pos_diputado:
+                pos_diputado[nombre] = len(diputados)
+                diputados.append(nombre)
+        for bloque in tabla["bloque"].dropna():
+            if bloque not in pos_bloque:
+                pos_bloque[bloque] = len(bloques)
+                bloques.append(bloque)
+        columnas.append(("csv", (
+            tabla["nombre"].map(pos_diputado).to_numpy(),
+            agregados.codificar_votos(tabla["voto"]),
+            tabla["bloque"].map(pos_bloque).fillna(SIN_DATO).astype(int).to_numpy(),
+        )))
+
+    votos = np.full((len(diputados), len(sesiones)), SIN_DATO, dtype=np.int8)
+    bloques_m = np.full((len(diputados), len(sesiones)), SIN_DATO, dtype=np.int16)
+    n_previos = len(previa["diputados"]) if previa else 0
+    for j, (origen, dato) in enumerate(columnas):
+        if origen == "previa":
+            votos[:n_previos, j] = previa["votos"][:, dato]
+            bloques_m[:n_previos, j] = previa["bloques_m"][:, dato]
+        else:
+            filas, v, b = dato
+            votos[filas, j] = v
+            bloques_m[filas, j] = b
+
+    ruta_votos, ruta_bloques, ruta_catalogo = (
+        versiones.ruta_escritura(temporal, r.relative_to(temporal)) for r in _rutas(temporal)
+    )
+    np.save(ruta_votos, votos)
+    np.save(ruta_bloques, bloques_m)
+    with open(ruta_catalogo, "w", encoding="utf-8") as f:
+        json.dump({
+            "diputados": diputados,
+            "sesiones": [s["id"] for s in sesiones],
+            "bloques": bloques,
+            "bloques_norm": [normalizar_bloque(b) for b in bloques],
+        }, f, ensure_ascii=False, indent=1)
+
+
+# ====== Lectura (dashboard) ======
+
+def abrir(directorio):
+    """Matriz de una versión, con los .npy mapeados en memoria (sólo lectura)."""
+    ruta_votos, ruta_bloques, ruta_catalogo = _rutas(directorio)
+    with open(ruta_catalogo, encoding="utf-8") as f:
+        catalogo = json.load(f)
+    return {
+        "votos": np.load(ruta_votos, mmap_mode="r"),
+        "bloques_m": np.load(ruta_bloques, mmap_mode="r"),
+        "diputados": np.array(catalogo["diputados"], dtype=object),
+        "sesiones": catalogo["sesiones"],
+        "bloques": np.array(catalogo["bloques"], dtype=object),
+        "bloques_norm": np.array(catalogo["bloques_norm"], dtype=object),
+    }
+
+
+def _categorica(codigos, etiquetas):
+    """Categórica desde códigos (-1 = NaN), con las categorías en orden alfabético."""
+    cat = pd.Categorical.from_codes(np.asarray(codigos, dtype=np.int64), categories=etiquetas)
+    return cat.reorder_categories(sorted(etiquetas))
+
+
+def votos_unidos(m, sesion_1, sesion_2):
+    """
+    Votos unidos de dos sesiones (como la hoja Votos_unidos ya normalizada:
+    nombre, bloque_1, voto_1, voto_2, bloque_norm, categoria_cambio), sólo
+    con quienes aparecen en ambas. Las columnas de texto son categóricas y
+    se arman desde los códigos de la matriz.
+    """
+    j1, j2 = m["sesiones"].index(sesion_1), m["sesiones"].index(sesion_2)
+    v1, v2 = m["votos"][:, j1], m["votos"][:, j2]
+    filas = np.flatnonzero((v1 != SIN_DATO) & (v2 != SIN_DATO))
+    v1, v2 = v1[filas], v2[filas]
+    b1 = m["bloques_m"][filas, j1]
+
+    # Código de cada bloque crudo entre los normalizados; el SIN_DATO del
+    # final hace que el índice -1 siga siendo SIN_DATO
+    norm = list(pd.unique(m["bloques_norm"]))
+    a_norm = np.append(pd.Index(norm).get_indexer(m["bloques_norm"]), SIN_DATO)
+
+    merged = pd.DataFrame({
+        "nombre": m["diputados"][filas],
+        "bloque_1": _categorica(b1, list(m["bloques"])),
+        "voto_1": pd.Categorical.from_codes(v1, categories=agregados.ESTADOS_EXT),
+        "voto_2": pd.Categorical.from_codes(v2, categories=agregados.ESTADOS_EXT),
+        "bloque_norm": _categorica(a_norm[b1], norm),
+        "categoria_cambio": agregados.CATEGORIAS[v1, v2],
+    })
+    return merged.sort_values("nombre").reset_index(drop=True)
+
+
+def votos_por_partes(m, sesiones=None, bloque=None, voto=None, titulos=None, tam=50_000):
+    """
+    Extracto de varias sesiones con las mismas columnas que
+    consultas.votos_por_partes (orden, sesion, titulo, nombre, bloque,
+    bloque_norm, voto), de a unas `tam` filas: cada parte es un grupo de
+    sesiones completas, armado con índices sobre la matriz mapeada.
+
+    sesiones: ids a incluir (None = todas); titulos: título de cada
+    columna de la matriz, en su orden.
+    """
+    ids = m["sesiones"]
+    columnas = np.arange(len(ids)) if sesiones is None else np.array([ids.index(s) for s in sesiones], dtype=int)
+    columnas = np.sort(columnas)
+    titulos = np.array(ids if titulos is None else titulos, dtype=object)
+
+    # Filas por nombre, como el ORDER BY de la base
+    por_nombre = np.argsort(m["diputados"].astype(str), kind="stable")
+    nombres = m["diputados"][por_nombre]
+    bloques = np.append(m["bloques"], None).astype(object)
+    bloques_norm = np.append(m["bloques_norm"], None).astype(object)
+    estados = np.array(agregados.ESTADOS_EXT, dtype=object)
+    codigo_voto = None
+    if voto not in (None, "Todos"):
+        codigo_voto = agregados.codificar_votos([voto])[0]
+
+    por_parte = max(1, tam // max(len(nombres), 1))
+    vacio = True
+    for inicio in range(0, len(columnas), por_parte):
+        cols = columnas[inicio:inicio + por_parte]
+        v = np.asarray(m["votos"][:, cols])[por_nombre].T        # (sesiones, diputados)
+        b = np.asarray(m["bloques_m"][:, cols])[por_nombre].T
+        dentro = v != SIN_DATO
+        if bloque not in (None, "TODOS"):
+            dentro &= bloques_norm[b] == bloque
+        if codigo_voto is not None:
+            dentro &= v == codigo_voto
+        j, i = np.nonzero(dentro)
+        if len(j) == 0:
+            continue
+        vacio = False
+        yield pd.DataFrame({
+            "orden": cols[j],
+            "sesion": np.array(ids, dtype=object)[cols[j]],
+            "titulo": titulos[cols[j]],
+            "nombre": nombres[i],
+            "bloque": bloques[b[j, i]],
+            "bloque_norm": bloques_norm[b[j, i]],
+            "voto": estados[v[j, i]],
+        })
+    if vacio:
+        yield pd.DataFrame(columns=["orden", "sesion", "titulo", "nombre", "bloque", "bloque_norm", "voto"])
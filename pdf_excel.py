@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import bisect
+import re
+import sys
+from datetime import datetime
+from pathlib import Path
+import collections
+
+import pandas as pd
+import pdfplumber
+import pypdfium2 as pdfium
+
+
+def _tablas_de_pagina(page, grouped):
+    """Detección completa de pdfplumber sobre una página (el camino lento)."""
+    page_tables = page.extract_tables() or []
+    for t_idx, table in enumerate(page_tables, start=1):
+        if not table:
+            continue
+
+        df = pd.DataFrame(table)
+
+        # Suponemos que la primera fila es el encabezado
+        if df.shape[0] < 2:
+            continue  # casi seguro no es tabla útil
+
+        df.columns = df.iloc[0].astype(str).str.strip()
+        df = df[1:].reset_index(drop=True)
+
+        # Normalizamos nombres de columnas
+        df.columns = [str(c).strip() for c in df.columns]
+
+        header_key = tuple(df.columns)
+        grouped[header_key].append(df)
+
+
+def extract_tables_from_pdf(pdf_path: Path, usar_plantilla=True):
+    """
+    Extrae todas las tablas de un PDF y las agrupa por encabezado.
+    Devuelve un dict:
+        { header_tuple: [df1, df2, ...] }
+    donde header_tuple es una tupla con los nombres de las columnas.
+
+    Con usar_plantilla=True la tabla nominal se lee con la plantilla de
+    columnas (ver más abajo), incluidas las páginas de continuación, y sólo
+    las páginas que no la cumplen pasan por la detección completa.
+    """
+    grouped = collections.defaultdict(list)
+
+    pendientes = _tablas_con_plantilla(pdf_path, grouped) if usar_plantilla else None
+    if pendientes == []:
+        return grouped
+
+    with pdfplumber.open(pdf_path, pages=None if pendientes is None else [p + 1 for p in pendientes]) as pdf:
+        for page_num, page in enumerate(pdf.pages, start=1):
+            _tablas_de_pagina(page, grouped)
+
+    return grouped
+
+
+def pdf_to_excel(pdf_path: Path, output_dir: Path = None):
+    """
+    Convierte un PDF en un Excel con una hoja por grupo de tablas
+    que tengan el mismo encabezado.
+    """
+    if output_dir is None:
+        output_dir = pdf_path.parent
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    grouped_tables = extract_tables_from_pdf(pdf_path)
+
+    if not grouped_tables:
+        print(f"[ADVERTENCIA] No se encontraron tablas en: {pdf_path.name}")
+        return None
+
+    output_path = output_dir / f"{pdf_path.stem}.xlsx"
+
+    with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
+        for i, (header, dfs) in enumerate(grouped_tables.items(), start=1):
+            merged_df = pd.concat(dfs, ignore_index=True)
+            sheet_name = f"Tabla_{i}"
+            merged_df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+    print(f"[OK] {pdf_path.name} -> {output_path.name}")
+    return output_path
+
+
+# ====== Plantilla de columnas (camino rápido) ======
+#
+# Todas las votaciones nominales del Congreso salen con el mismo formato:
+# una tabla "No. | NOMBRE | BLOQUE | VOTO EMITIDO" con las columnas en la
+# misma posición en todas las páginas. Los bordes de columna se aprenden
+# una vez con la detección completa de pdfplumber y se guardan por firma
+# del encabezado; desde ahí cada página se arma con los segmentos de texto
+# que entrega pdfium (sin interpretar la página con pdfminer), que es
+# decenas de veces más barato que buscar las líneas de la tabla.
+
+# {firma_del_encabezado: plantilla}, compartido entre documentos
+_PLANTILLAS = {}
+
+# Tolerancia (en puntos) para considerar que dos segmentos están en la misma línea
+TOL_LINEA = 2
+
+
+def _segmentos(page):
+    """Segmentos de texto de una página de pdfium, con coordenadas como pdfplumber (top hacia abajo)."""
+    alto = page.get_height()
+    textpage = page.get_textpage()
+    try:
+        segmentos = []
+        for i in range(textpage.count_rects()):
+            izq, abajo, der, arriba = textpage.get_rect(i)
+            texto = textpage.get_text_bounded(izq, abajo, der, arriba).strip()
+            if texto:
+                segmentos.append({
+                    "text": texto, "x0": izq, "x1": der,
+                    "top": alto - arriba, "bottom": alto - abajo,
+                })
+        return segmentos
+    finally:
+        textpage.close()
+
+
+def _lineas_de_encabezado(segmentos, texto, x_max=None):
+    """
+    Líneas de segmentos que empiezan con la primera palabra de `texto`
+    (y, si se da x_max, antes de esa coordenada: el "No." del título de la
+    página no cuenta).
+    """
+    primera = texto.split()[0]
+    for s in segmentos:
+        if s["text"] != primera or (x_max is not None and s["x0"] > x_max):
+            continue
+        linea = sorted(
+            (x for x in segmentos if abs(x["top"] - s["top"]) <= TOL_LINEA),
+            key=lambda x: x["x0"],
+        )
+        if linea[0] is s:
+            yield linea
+
+
+def _texto(linea):
+    return " ".join(x["text"] for x in linea)
+
+
+def _firma(ancho, alto, linea):
+    return (round(ancho), round(alto), tuple((x["text"], round(x["x0"])) for x in linea))
+
+
+def buscar_plantilla(pdf_path: Path, num_pagina, ancho, alto, segmentos):
+    """
+    Devuelve la plantilla de la tabla nominal de la página, o None si la
+    página no la trae. Sólo corre la detección completa la primera vez que
+    aparece un encabezado con esa geometría.
+    """
+    candidatas = list(_lineas_de_encabezado(segmentos, "No."))
+    for linea in candidatas:
+        firma = _firma(ancho, alto, linea)
+        if firma in _PLANTILLAS:
+            return _PLANTILLAS[firma]
+    if not candidatas:
+        return None
+
+    with pdfplumber.open(pdf_path, pages=[num_pagina + 1]) as pdf:
+        tablas = pdf.pages[0].find_tables()
+        for tabla in tablas:
+            filas = tabla.extract()
+            if not filas or not es_tabla_de_votos([c or "" for c in filas[0]]):
+                continue
+
+            columnas = [
+                (str(h).strip(), celda)
+                for h, celda in zip(filas[0], tabla.rows[0].cells)
+                if celda is not None and h and str(h).strip()
+            ]
+            plantilla = {
+                "columnas": tuple(h for h, _ in columnas),
+                # borde izquierdo de cada columna + borde derecho de la última
+                "bordes": [c[0] for _, c in columnas] + [columnas[-1][1][2]],
+            }
+            for linea in candidatas:
+                if _texto(linea) == " ".join(plantilla["columnas"]):
+                    _PLANTILLAS[_firma(ancho, alto, linea)] = plantilla
+            return plantilla
+
+    return None
+
+
+def _columna(segmento, bordes):
+    """
+    Columna del segmento según dónde empieza (las celdas van alineadas a la
+    izquierda y un texto largo puede pasarse del borde derecho), o None si
+    está fuera de la tabla.
+    """
+    col = bisect.bisect_right(bordes, segmento["x0"] + TOL_LINEA) - 1
+    if col < 0 or col >= len(bordes) - 1:
+        return None
+    return col
+
+
+def _bloques(segmentos, altura):
+    """
+    Agrupa los renglones de una columna en celdas: dos renglones seguidos
+    son de la misma celda si el espacio entre ellos es menor que `altura`
+    (dentro de una celda hay ~1 altura de texto, entre celdas el doble).
+    """
+    bloques = []
+    for s in sorted(segmentos, key=lambda x: x["top"]):
+        if bloques and s["top"] - bloques[-1][-1]["bottom"] < altura:
+            bloques[-1].append(s)
+        else:
+            bloques.append([s])
+    return bloques
+
+
+def _unir_renglones(bloque):
+    lineas = collections.defaultdict(list)
+    for s in sorted(bloque, key=lambda x: (x["top"], x["x0"])):
+        clave = next((t for t in lineas if abs(t - s["top"]) <= TOL_LINEA), s["top"])
+        lineas[clave].append(s["text"])
+    return "\n".join(" ".join(ts) for _, ts in sorted(lineas.items()))
+
+
+def filas_con_plantilla(segmentos, plantilla):
+    """
+    Arma la tabla nominal de una página con la plantilla. Devuelve un
+    DataFrame (vacío si la página no tiene filas) o None si la página no
+    cumple la plantilla y hay que usar la detección completa.
+
+    Cada fila empieza donde hay un número en la columna "No."; los renglones
+    partidos de NOMBRE/BLOQUE se agrupan en celdas y cada celda va a la fila
+    cuyo número está más cerca de su centro. Las páginas de continuación
+    (sin encabezado) se leen igual.
+    """
+    columnas = plantilla["columnas"]
+    bordes = plantilla["bordes"]
+
+    # Sólo se corta arriba si la página trae su propio encabezado: en una de
+    # continuación la tabla puede empezar en el margen, y lo que no es tabla
+    # lo descartan las anclas y la revisión de texto suelto
+    inicio = None
+    for linea in _lineas_de_encabezado(segmentos, columnas[0], x_max=bordes[1]):
+        if _texto(linea) != " ".join(columnas):
+            return None  # otra tabla (p. ej. el resumen de la votación)
+        inicio = max(x["bottom"] for x in linea)
+
+    por_columna = collections.defaultdict(list)
+    for s in segmentos:
+        if inicio is not None and s["top"] < inicio - TOL_LINEA:
+            continue
+        col = _columna(s, bordes)
+        if col is not None:
+            por_columna[col].append(s)
+
+    anclas = [s for s in por_columna[0] if s["text"].isdigit()]
+    if not anclas:
+        return pd.DataFrame(columns=list(columnas))
+    anclas.sort(key=lambda x: x["top"])
+    centros = [(s["top"] + s["bottom"]) / 2 for s in anclas]
+    altura = sorted(s["bottom"] - s["top"] for s in anclas)[len(anclas) // 2]
+
+    filas = [[None] * len(columnas) for _ in anclas]
+    for col in range(len(columnas)):
+        for bloque in _bloques(por_columna[col], 1.5 * altura):
+            centro = (bloque[0]["top"] + bloque[-1]["bottom"]) / 2
+            i = min(range(len(anclas)), key=lambda k: abs(centros[k] - centro))
+            if abs(centros[i] - centro) > 2 * altura:
+                if centros[0] < centro < centros[-1]:
+                    return None  # texto suelto entre filas: no es esta plantilla
+                continue  # subtotal ("A favor 40") o pie de página
+            if filas[i][col] is not None:
+                return None  # dos celdas para la misma fila: agrupación ambigua
+            filas[i][col] = _unir_renglones(bloque)
+
+    df = pd.DataFrame(filas, columns=list(columnas))
+    # Toda fila nominal trae nombre y voto; si no, la plantilla no aplica
+    obligatorias = [c for c in columnas if "NOMBRE" in c.upper() or "VOTO" in c.upper()]
+    if df[obligatorias].isna().any(axis=None):
+        return None
+    return df.fillna("")
+
+
+def _tablas_con_plantilla(pdf_path: Path, grouped):
+    """
+    Lee con la plantilla todas las páginas que la cumplen. Devuelve los
+    números de página (base 0) que necesitan la detección completa.
+    """
+    pendientes = []
+    doc = pdfium.PdfDocument(str(pdf_path))
+    try:
+        plantilla = None
+        for num_pagina in range(len(doc)):
+            page = doc[num_pagina]
+            try:
+                segmentos = _segmentos(page)
+                ancho, alto = page.get_width(), page.get_height()
+            finally:
+                page.close()
+
+            if plantilla is None:
+                plantilla = buscar_plantilla(pdf_path, num_pagina, ancho, alto, segmentos)
+            df = filas_con_plantilla(segmentos, plantilla) if plantilla is not None else None
+            if df is None:
+                pendientes.append(num_pagina)
+            elif len(df):
+                grouped[plantilla["columnas"]].append(df)
+    finally:
+        doc.close()
+    return pendientes
+
+
+# ====== Votación nominal (lo que consume el análisis) ======
+
+RE_EVENTO = re.compile(r"EVENTO DE VOTACI[ÓO]N\s*#\s*(\d+)")
+RE_FECHA = re.compile(r"(\d{2}-\d{2}-\d{4})\s+(\d{2}:\d{2}:\d{2})")
+RE_INICIATIVA = re.compile(r"INICIATIVA\s+DE\s+LEY\s+(\d+)")
+RE_SESION = re.compile(r"SESI[ÓO]N\s+No\.\s*(\d+)")
+
+
+def extraer_metadatos(texto):
+    """
+    Lee del encabezado de la primera página el número de evento, la fecha
+    y hora, la iniciativa y la sesión. Lo que no encuentre queda en None.
+    """
+    # El encabezado parte frases en varias líneas ("INICIATIVA DE\nLEY 6625")
+    plano = " ".join(texto.split())
+
+    meta = {"evento": None, "fecha": None, "iniciativa": None, "sesion": None}
+
+    m = RE_EVENTO.search(plano)
+    if m:
+        meta["evento"] = int(m.group(1))
+
+    m = RE_FECHA.search(plano)
+    if m:
+        meta["fecha"] = datetime.strptime(
+            f"{m.group(1)} {m.group(2)}", "%d-%m-%Y %H:%M:%S"
+        ).isoformat()
+
+    m = RE_INICIATIVA.search(plano)
+    if m:
+        meta["iniciativa"] = m.group(1)
+
+    m = RE_SESION.search(plano)
+    if m:
+        meta["sesion"] = int(m.group(1))
+
+    return meta
+
+
+def es_tabla_de_votos(header):
+    """La tabla nominal es la que trae NOMBRE y VOTO (la otra es el resumen)."""
+    cols = [str(c).upper() for c in header]
+    return any("NOMBRE" in c for c in cols) and any("VOTO" in c for c in cols)
+
+
+def extraer_votacion(pdf_path: Path):
+    """
+    Extrae de un PDF de votación nominal la tabla de votos (todas las
+    páginas unidas) y los metadatos del encabezado.
+    Devuelve (metadatos, df) con las columnas tal como vienen en el PDF.
+    """
+    doc = pdfium.PdfDocument(str(pdf_path))
+    try:
+        texto = doc[0].get_textpage().get_text_range() if len(doc) else ""
+    finally:
+        doc.close()
+
+    metadatos = extraer_metadatos(texto)
+
+    grouped_tables = extract_tables_from_pdf(pdf_path)
+    tablas = [
+        df
+        for header, dfs in grouped_tables.items()
+        if es_tabla_de_votos(header)
+        for df in dfs
+    ]
+    if not tablas:
+        raise ValueError(f"No encontré la tabla de votos en: {pdf_path.name}")
+
+    # La detección completa puede traer columnas vacías extra ('', 'No.', ..., '')
+    tablas = [df.loc[:, [c for c in df.columns if c]] for df in tablas]
+    return metadatos, pd.concat(tablas, ignore_index=True)
+
+
+def main():
+    """
+    Uso:
+      - En terminal:
+            python pdf_excel.py archivo1.pdf archivo2.pdf
+      - En Jupyter: simplemente ejecuta la celda, y buscará todos los .pdf
+        de la carpeta actual, ignorando argumentos raros del kernel.
+    """
+    # Nos quedamos SOLO con argumentos que terminen en .pdf
+    arg_pdfs = [a for a in sys.argv[1:] if a.lower().endswith(".pdf")]
+
+    if arg_pdfs:
+        pdf_paths = [Path(p) for p in arg_pdfs]
+    else:
+        # Si no hay PDFs en los argumentos, tomamos todos los .pdf del directorio
+        pdf_paths = sorted(Path(".").glob("*.pdf"))
+
+    if not pdf_paths:
+        print("No encontré archivos PDF en la carpeta actual ni en los argumentos.")
+        return
+
+    print("Procesando PDFs:")
+    for pdf_path in pdf_paths:
+        if not pdf_path.is_file():
+            print(f"[ERROR] No existe el archivo: {pdf_path}")
+            continue
+        pdf_to_excel(pdf_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Arranca el dashboard con el cache ya precargado.
+
+    python servidor.py                        # = streamlit run app.py
+    python servidor.py --server.port 8502     # opciones de streamlit run
+
+Es lo mismo que `streamlit run app.py`, pero la precarga (ver carga.py)
+empieza en cuanto levanta el proceso y corre mientras el servidor arranca,
+así que el primer usuario ya no paga la lectura de los Excel.
+"""
+
+import sys
+from pathlib import Path
+
+import carga
+import versiones
+
+
+def main():
+    carga.iniciar_precarga(versiones.version_actual())
+
+    from streamlit.web import cli
+
+    app = Path(__file__).with_name("app.py")
+    sys.argv = ["streamlit", "run", str(app), *sys.argv[1:]]
+    sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Simulación Monte Carlo de la próxima votación.
+
+Cada diputado parte de su último voto y pasa al siguiente según la matriz
+de transición de su bloque (ver agregados.py). Si el bloque nunca mostró
+esa fila se usa la fila global, y si tampoco hay datos el diputado repite
+su voto. Con `incertidumbre=True` cada simulación usa además su propia
+matriz, muestreada de una Dirichlet(conteos + 0.5): un bloque de 3
+diputados no se toma como si su 100% fuera seguro.
+
+Todo se muestrea en una sola llamada vectorizada: los diputados del mismo
+bloque con el mismo último voto se sortean juntos, con una multinomial
+por grupo y simulación (a lo sumo bloques × 4 grupos, no 160 diputados).
+
+El resultado se decide con las reglas del Congreso de la República, no
+con favor > contra:
+
+    quórum       presentes (A FAVOR + EN CONTRA) >= mitad + 1 del total
+    "simple"     más votos a favor que en contra
+    "absoluta"   A FAVOR >= mitad + 1 del total de diputados (81 de 160)
+    "calificada" A FAVOR >= dos terceras partes del total (107 de 160)
+
+EMPATE sólo existe con mayoría simple (favor == contra); con las reglas de
+umbral, si A FAVOR no llega al umbral la votación es NO APROBADO aunque
+haya tantos votos a favor como en contra.
+
+Un bloque es pivote en una simulación si, cambiando de lado sus votos
+(A FAVOR <-> EN CONTRA), el resultado cambia.
+"""
+
+import numpy as np
+
+import agregados
+from analisis import ESTADOS
+
+TOTAL_DIPUTADOS = 160
+N_SIMULACIONES = 10000
+SEMILLA = 20251126
+SUAVIZADO = 0.5
+
+REGLAS = {
+    "absoluta": "Mayoría absoluta (mitad + 1 del total)",
+    "calificada": "Mayoría calificada (dos terceras partes del total)",
+    "simple": "Mayoría simple (más a favor que en contra)",
+}
+
+APROBADO, NO_APROBADO, EMPATE, SIN_QUORUM = range(4)
+RESULTADOS = ["APROBADO", "NO APROBADO", "EMPATE", "SIN QUÓRUM"]
+
+_FAVOR = ESTADOS.index("A FAVOR")
+_CONTRA = ESTADOS.index("EN CONTRA")
+_AUSENTE = ESTADOS.index("AUSENTE")
+K = len(ESTADOS)
+
+
+def quorum(total=TOTAL_DIPUTADOS):
+    return total // 2 + 1
+
+
+def umbral(regla, total=TOTAL_DIPUTADOS):
+    """Votos A FAVOR necesarios, o None si basta con superar a los votos en contra."""
+    if regla == "absoluta":
+        return total // 2 + 1
+    if regla == "calificada":
+        return -(-2 * total // 3)
+    if regla == "simple":
+        return None
+    raise ValueError(f"Regla desconocida: {regla}")
+
+
+def resultado(favor, contra, regla, total=TOTAL_DIPUTADOS):
+    """Código de RESULTADOS para arrays de votos a favor / en contra."""
+    favor, contra = np.asarray(favor), np.asarray(contra)
+    necesarios = umbral(regla, total)
+    if necesarios is None:
+        aprobado, empate = favor > contra, favor == contra
+    else:
+        # Con umbral, no alcanzarlo es NO APROBADO aunque favor == contra
+        aprobado, empate = favor >= necesarios, np.zeros_like(favor, dtype=bool)
+    return np.select(
+        [favor + contra < quorum(total), aprobado, empate],
+        [SIN_QUORUM, APROBADO, EMPATE],
+        NO_APROBADO,
+    )
+
+
+# ====== Probabilidades de transición ======
+
+def probabilidades(conteos, grupos, n_simulaciones, incertidumbre, rng):
+    """
+    Fila de la matriz de transición de cada grupo (bloque, último voto):
+    (n_simulaciones o 1, grupos, k). Si el bloque no tiene datos en esa
+    fila se usa la fila global, y si tampoco hay, el voto se repite.
+    Sólo se muestrean las filas que se usan, no la matriz completa.
+    """
+    conteos = np.asarray(conteos)[:, :K, :K].astype(float)
+    filas = conteos[grupos[:, 0], grupos[:, 1]]
+    globales = conteos.sum(axis=0)[grupos[:, 1]]
+    filas = np.where(filas.sum(axis=1, keepdims=True) > 0, filas, globales)
+    sin_datos = filas.sum(axis=1) == 0
+    repite = np.eye(K)[grupos[:, 1]]
+
+    if not incertidumbre:
+        filas = np.where(sin_datos[:, None], repite, filas)
+        return (filas / filas.sum(axis=1, keepdims=True))[None]
+
+    # Dirichlet por fila vía gammas normalizadas, todas las simulaciones a la vez
+    gammas = rng.standard_gamma(filas + SUAVIZADO, size=(n_simulaciones, *filas.shape))
+    return np.where(sin_datos[:, None], repite, gammas / gammas.sum(axis=-1, keepdims=True))
+
+
+# ====== Simulación ======
+
+def simular(agregado, bloques, votos, regla="absoluta", n_simulaciones=N_SIMULACIONES,
+            incertidumbre=True, total=TOTAL_DIPUTADOS, semilla=SEMILLA):
+    """
+    agregado: tensor de conteos (agregados.tensor_desde_merged / cargar).
+    bloques:  bloque normalizado de cada diputado (mismas etiquetas que el tensor).
+    votos:    último voto de cada diputado (ESTADOS; lo demás cuenta como AUSENTE).
+
+    Devuelve un dict con:
+        probabilidades   {resultado: probabilidad}
+        favor, contra    votos de cada simulación (n_simulaciones,)
+        pivotes          DataFrame-able: bloque, diputados, prob_pivote, favor_esperado
+    """
+    rng = np.random.default_rng(semilla)
+    bloques = np.asarray(bloques, dtype=object)
+    estado = np.array([ESTADOS.index(v) if v in ESTADOS else _AUSENTE for v in votos])
+
+    # Bloques de los diputados en el tensor; los que no aparecen usan sólo la fila global
+    nombres = list(agregado["bloques"])
+    extra = sorted(set(bloques) - set(nombres))
+    tensor = agregados.alinear(agregado, nombres + extra)
+    b = np.array([(nombres + extra).index(x) for x in bloques], dtype=int)
+
+    # Los diputados con el mismo bloque y el mismo último voto comparten
+    # distribución: basta con una multinomial por grupo y simulación
+    grupos, n_grupo = np.unique(np.column_stack([b, estado]), axis=0, return_counts=True)
+    p = probabilidades(tensor["conteos"], grupos, n_simulaciones, incertidumbre, rng)
+    p = np.broadcast_to(p, (n_simulaciones, len(grupos), K))
+    siguiente = rng.multinomial(n_grupo, p)                        # (S, grupos, k)
+
+    # Conteos por bloque y simulación: grupos × pertenencia a bloque
+    pertenencia = np.zeros((len(grupos), len(nombres) + len(extra)))
+    pertenencia[np.arange(len(grupos)), grupos[:, 0]] = 1
+    favor_b = siguiente[..., _FAVOR] @ pertenencia                  # (S, B)
+    contra_b = siguiente[..., _CONTRA] @ pertenencia
+    favor, contra = favor_b.sum(axis=1), contra_b.sum(axis=1)
+
+    res = resultado(favor, contra, regla, total)
+    volteado = resultado(
+        favor[:, None] - favor_b + contra_b, contra[:, None] - contra_b + favor_b, regla, total
+    )
+    prob_pivote = (volteado != res[:, None]).mean(axis=0)
+
+    diputados = n_grupo @ pertenencia
+    presentes = diputados > 0
+    return {
+        "probabilidades": {
+            nombre: float((res == i).mean()) for i, nombre in enumerate(RESULTADOS)
+        },
+        "favor": favor.astype(int),
+        "contra": contra.astype(int),
+        "pivotes": {
+            "bloque": [x for x, ok in zip(nombres + extra, presentes) if ok],
+            "diputados": diputados[presentes].astype(int),
+            "prob_pivote": prob_pivote[presentes],
+            "favor_esperado": favor_b.mean(axis=0)[presentes],
+        },
+        "regla": regla,
+        "umbral": umbral(regla, total),
+        "quorum": quorum(total),
+        "n_simulaciones": n_simulaciones,
+    }
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Publicar sesiones de a una en un datos/ vacío, como cuando se dejan los
+PDFs en el buzón uno por uno.
+
+    python -m pytest -q test_ingesta.py
+"""
+
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import agregados
+import ingesta
+import versiones
+
+AQUI = Path(__file__).parent
+PDFS = [
+    AQUI / "1er. evento de votación sobre participación de Cacif en Conadie.pdf",
+    AQUI / "2o. evento de votación por participación del Cacif en Conadie.pdf",
+]
+
+
+def _publicar(pdf, base, pool):
+    entrada = base / "entrada"
+    entrada.mkdir(parents=True, exist_ok=True)
+    copia = Path(shutil.copy(pdf, entrada))
+    ingesta.procesar_lote([copia], pool, base)
+    return versiones.version_actual(base)
+
+
+def test_primera_sesion_y_luego_la_segunda(tmp_path):
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        # Primera sesión: todavía no hay comparaciones y el total queda vacío
+        v1 = _publicar(PDFS[0], tmp_path, pool)
+        assert v1 is not None
+        manifiesto = versiones.leer_manifiesto(v1, tmp_path)
+        assert len(manifiesto["sesiones"]) == 1
+        assert manifiesto["comparaciones"] == []
+        total = agregados.cargar(versiones.ruta_version(v1, tmp_path) / agregados.RUTA_TOTAL)
+        assert total["bloques"] == [] and total["conteos"].shape == (0, agregados.N_ESTADOS, agregados.N_ESTADOS)
+
+        # Segunda sesión: aparece la primera comparación y entra al total
+        v2 = _publicar(PDFS[1], tmp_path, pool)
+        assert v2 != v1
+        manifiesto = versiones.leer_manifiesto(v2, tmp_path)
+        assert len(manifiesto["sesiones"]) == 2
+        assert len(manifiesto["comparaciones"]) == 1
+        directorio = versiones.ruta_version(v2, tmp_path)
+        par = agregados.cargar(directorio / agregados.ruta_par(manifiesto["comparaciones"][0]["id"]))
+        total = agregados.cargar(directorio / agregados.RUTA_TOTAL)
+        assert total["pares"] == [manifiesto["comparaciones"][0]["id"]]
+        assert (total["conteos"].sum(axis=0) == par["conteos"].sum(axis=0)).all()
+
+    assert not (tmp_path / "errores").exists()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Lectura con plantilla de una página de continuación sin encabezado.
+
+Los PDFs de ejemplo repiten el título y el encabezado en cada página, así
+que la página sin encabezado se arma a partir de una real: se quitan el
+título y el encabezado y la tabla se sube al margen superior.
+
+    python -m pytest -q test_pdf_excel.py
+"""
+
+from pathlib import Path
+
+import pypdfium2 as pdfium
+
+import pdf_excel
+
+AQUI = Path(__file__).parent
+PDF = AQUI / "1er. evento de votación sobre participación de Cacif en Conadie.pdf"
+
+# Dónde queda la primera fila de la tabla en la página simulada (puntos)
+MARGEN = 30
+
+
+def _paginas(pdf_path):
+    doc = pdfium.PdfDocument(str(pdf_path))
+    try:
+        paginas = []
+        for num_pagina in range(len(doc)):
+            page = doc[num_pagina]
+            try:
+                paginas.append((pdf_excel._segmentos(page), page.get_width(), page.get_height()))
+            finally:
+                page.close()
+        return paginas
+    finally:
+        doc.close()
+
+
+def _sin_encabezado(segmentos, columnas):
+    """La misma página sin título ni encabezado, con la tabla arriba de todo."""
+    linea = next(pdf_excel._lineas_de_encabezado(segmentos, " ".join(columnas)))
+    corte = max(x["bottom"] for x in linea)
+    tabla = [s for s in segmentos if s["top"] > corte + pdf_excel.TOL_LINEA]
+    desplazamiento = min(s["top"] for s in tabla) - MARGEN
+    return [
+        {**s, "top": s["top"] - desplazamiento, "bottom": s["bottom"] - desplazamiento}
+        for s in tabla
+    ]
+
+
+def test_pagina_de_continuacion_pegada_al_margen():
+    paginas = _paginas(PDF)
+    segmentos, ancho, alto = paginas[0]
+    plantilla = pdf_excel.buscar_plantilla(PDF, 0, ancho, alto, segmentos)
+    assert plantilla is not None
+
+    original = pdf_excel.filas_con_plantilla(paginas[1][0], plantilla)
+    continuacion = pdf_excel.filas_con_plantilla(
+        _sin_encabezado(paginas[1][0], plantilla["columnas"]), plantilla
+    )
+    assert continuacion is not None
+    assert len(continuacion) == len(original) == 21
+    assert continuacion.equals(original)
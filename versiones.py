@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Versiones publicadas del dataset de votaciones.
+
+Estructura en disco (raíz configurable con VOTACIONES_DATOS):
+
+    datos/
+      entrada/                  # buzón que vigila ingesta.py
+      procesados/ errores/      # PDFs ya atendidos
+      versiones/<version>/
+        manifiesto.json
+        sesiones/<sesion>.csv   # votos estandarizados de cada votación
+        analisis/<a>__<b>.xlsx  # mismo libro que genera votaciones.ipynb
+        agregados/ intervalos/  # conteos e IC por par y total (agregados.py, intervalos.py)
+        matriz/                 # votos codificados diputado × sesión (matriz.py)
+        consultas.sqlite        # base indexada para consultas entre sesiones (consultas.py)
+      ACTUAL                    # nombre de la versión vigente
+      exportes/<version>/       # descargas ya generadas por el dashboard (exportar.py)
+      exportes/fijos/<excel>/<firma>/   # las de los Excel fijos, por versión del archivo
+
+Una versión nunca se modifica después de publicada: se arma en un
+directorio temporal (reutilizando con hard links los archivos de la
+anterior), se renombra y al final se cambia ACTUAL con os.replace.
+Los dashboards sólo tienen que comparar ACTUAL con lo que ya cargaron.
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+
+DATOS_DIR = Path(os.environ.get("VOTACIONES_DATOS", "datos"))
+
+# Cuántas versiones viejas se dejan en disco (para sesiones abiertas)
+CONSERVAR = 5
+
+
+def directorio_datos(base=None):
+    return Path(base) if base is not None else DATOS_DIR
+
+
+def version_actual(base=None):
+    """Nombre de la versión vigente, o None si todavía no se publicó nada."""
+    try:
+        return (directorio_datos(base) / "ACTUAL").read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def ruta_version(version, base=None):
+    return directorio_datos(base) / "versiones" / version
+
+
+def ruta_exportes(version, base=None):
+    """Cache de exportaciones de una versión (no forma parte de la versión publicada)."""
+    return directorio_datos(base) / "exportes" / version
+
+
+def exportes_fijos(excel, firma, base=None):
+    """
+    Cache de exportaciones de un Excel fijo (analisis_votaciones*.xlsx) para
+    una firma del archivo. Si el Excel se regeneró, borra las de las firmas
+    anteriores, que ya no se van a pedir.
+    """
+    raiz = directorio_datos(base) / "exportes" / "fijos" / Path(excel).stem
+    actual = raiz / str(firma)
+    if raiz.exists():
+        for vieja in raiz.iterdir():
+            if vieja != actual:
+                shutil.rmtree(vieja, ignore_errors=True)
+    return actual
+
+
+def manifiesto_vacio():
+    return {"version": None, "creada": None, "sesiones": [], "comparaciones": []}
+
+
+def leer_manifiesto(version=None, base=None):
+    """Manifiesto de una versión (por defecto la vigente)."""
+    version = version or version_actual(base)
+    if version is None:
+        return manifiesto_vacio()
+    with open(ruta_version(version, base) / "manifiesto.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ====== Publicación ======
+
+def _nuevo_nombre():
+    return datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+
+
+def preparar_version(base=None):
+    """
+    Crea el directorio temporal de la siguiente versión con el contenido de
+    la vigente (hard links; copia si el sistema de archivos no los soporta).
+    Devuelve (ruta_temporal, manifiesto_copiado).
+    """
+    base = directorio_datos(base)
+    raiz = base / "versiones"
+    raiz.mkdir(parents=True, exist_ok=True)
+
+    nombre = _nuevo_nombre()
+    temporal = raiz / f".tmp-{nombre}"
+    temporal.mkdir()
+
+    actual = version_actual(base)
+    if actual is not None:
+        origen = ruta_version(actual, base)
+        for ruta in origen.rglob("*"):
+            if ruta.is_dir() or ruta.name == "manifiesto.json":
+                continue
+            destino = temporal / ruta.relative_to(origen)
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(ruta, destino)
+            except OSError:
+                shutil.copy2(ruta, destino)
+
+    manifiesto = leer_manifiesto(actual, base)
+    manifiesto["version"] = nombre
+    return temporal, manifiesto
+
+
+def ruta_escritura(temporal, relativa):
+    """
+    Ruta donde escribir un archivo nuevo dentro de la versión temporal.
+    Si ya existía (hard link a la versión anterior) se desvincula primero
+    para no modificar la versión publicada.
+    """
+    ruta = Path(temporal) / relativa
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    ruta.unlink(missing_ok=True)
+    return ruta
+
+
+def confirmar_version(temporal, manifiesto, base=None):
+    """Publica la versión temporal y la deja como vigente."""
+    base = directorio_datos(base)
+    temporal = Path(temporal)
+
+    manifiesto["creada"] = datetime.now().isoformat(timespec="seconds")
+    with open(ruta_escritura(temporal, "manifiesto.json"), "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=1)
+
+    final = ruta_version(manifiesto["version"], base)
+    os.replace(temporal, final)
+
+    puntero = base / "ACTUAL.tmp"
+    puntero.write_text(manifiesto["version"], encoding="utf-8")
+    os.replace(puntero, base / "ACTUAL")
+
+    limpiar_versiones(base)
+    return manifiesto["version"]
+
+
+def descartar_version(temporal):
+    shutil.rmtree(temporal, ignore_errors=True)
+
+
+def limpiar_versiones(base=None, conservar=CONSERVAR):
+    """Borra las versiones viejas; nunca la vigente."""
+    base = directorio_datos(base)
+    raiz = base / "versiones"
+    actual = version_actual(base)
+
+    publicadas = sorted(
+        p for p in raiz.iterdir() if p.is_dir() and not p.name.startswith(".")
+    )
+    viejas = [p for p in publicadas[:-conservar] if p.name != actual]
+    for p in viejas:
+        shutil.rmtree(p, ignore_errors=True)
+        shutil.rmtree(ruta_exportes(p.name, base), ignore_errors=True)